@@ -0,0 +1,77 @@
+import os
+
+import pygame
+
+from atlas import sheet_key
+from textures import texture_budget
+
+# Unit (dx, dy) step for each spritesheet row: down, left, right, up
+DIRECTION_STEPS = ((0, 1), (-1, 0), (1, 0), (0, -1))
+DIRECTIONS = len(DIRECTION_STEPS)
+
+
+def load_spritesheet(filename, frame_width, frame_height, scale=1.5):
+    if not os.path.exists(filename):
+        return [[]]
+    sheet = pygame.image.load(filename).convert_alpha()
+    sheet_rect = sheet.get_rect()
+    rows = sheet_rect.height // frame_height
+    cols = sheet_rect.width // frame_width
+    frames = []
+    for r in range(rows):
+        row_frames = []
+        for c in range(cols):
+            frame_rect = pygame.Rect(c * frame_width, r * frame_height, frame_width, frame_height)
+            frame = sheet.subsurface(frame_rect).copy()
+            if not pygame.mask.from_surface(frame).count():
+                continue
+            frame = pygame.transform.scale(frame, (int(frame_width * scale), int(frame_height * scale)))
+            row_frames.append(frame)
+        frames.append(row_frames)
+    return frames
+
+
+# --- Shared Animations ---
+class Animation:
+    # Read-only and shared by every character using the same sheet
+    def __init__(self, rows):
+        self.rows = tuple(tuple(row) for row in rows)
+        first = self.rows[0] if self.rows else ()
+        # Missing direction rows fall back to the last row, empty rows to the first
+        self.directions = tuple(
+            (self.rows[min(d, len(self.rows) - 1)] or first) if self.rows else ()
+            for d in range(DIRECTIONS)
+        )
+        self.first_frame = first[0] if first else None
+        self.frame_count = sum(len(row) for row in self.rows)
+
+
+class AnimationCache:
+    def __init__(self):
+        self.animations = {}
+
+    def get(self, filename, frame_size, scale, atlas=None):
+        key = (filename, tuple(frame_size), scale)
+        animation = self.animations.get(key)
+        if animation is None:
+            frame_width, frame_height = frame_size
+            size = (int(frame_width * scale), int(frame_height * scale))
+            baked = atlas.sheets.get(sheet_key(filename, scale)) if atlas else None
+            if baked and any(baked) and next(row for row in baked if row)[0].get_size() == size:
+                rows = baked
+            else:
+                rows = load_spritesheet(filename, frame_width, frame_height, scale)
+            rows = [
+                [texture_budget.optimize(frame, "animations", (*key, r, c)) for c, frame in enumerate(row)]
+                for r, row in enumerate(rows)
+            ]
+            animation = Animation(rows)
+            self.animations[key] = animation
+        return animation
+
+    def clear(self):
+        self.animations.clear()
+        texture_budget.clear("animations")
+
+
+animation_cache = AnimationCache()
@@ -0,0 +1,61 @@
+import base64
+import json
+import os
+import zlib
+
+import pygame
+
+ATLAS_DIR = "assets"
+ATLAS_MANIFEST = os.path.join(ATLAS_DIR, "atlas.json")
+ATLAS_VERSION = 2  # 2: sheets keyed by file and scale
+
+
+def encode_mask(mask):
+    return base64.b64encode(zlib.compress(mask, 9)).decode("ascii")
+
+
+def decode_mask(data):
+    return zlib.decompress(base64.b64decode(data))
+
+
+def sheet_key(filename, scale):
+    # One baked copy of a spritesheet per scale it is drawn at
+    return f"{filename}@{scale}"
+
+
+# --- Baked Texture Atlas ---
+class Atlas:
+    def __init__(self, surface, manifest):
+        self.tile_size = manifest["tile_size"]
+        self.tiles = {}
+        self.tile_masks = {}
+        self.images = {}
+        self.sheets = {}
+
+        for key, entry in manifest["tiles"].items():
+            self.tiles[int(key)] = surface.subsurface(entry["rect"])
+            self.tile_masks[int(key)] = decode_mask(entry["walk"])
+        for key, entry in manifest["images"].items():
+            self.images[key] = surface.subsurface(entry["rect"])
+        for key, entry in manifest["sheets"].items():
+            self.sheets[key] = [[surface.subsurface(rect) for rect in row] for row in entry["rows"]]
+
+
+def load_atlas(manifest_path=ATLAS_MANIFEST, tile_size=None):
+    # Returns None when there is no usable bake, so callers can fall back to the raw files
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != ATLAS_VERSION:
+        return None
+    if tile_size is not None and manifest["tile_size"] != tile_size:
+        return None
+
+    atlas_path = os.path.join(os.path.dirname(manifest_path), manifest["atlas"])
+    if not os.path.exists(atlas_path):
+        return None
+    # Not converted as a whole: every entry is converted on its own once
+    # copied out (textures.optimize), which saves a second copy of the sheet
+    surface = pygame.image.load(atlas_path)
+    return Atlas(surface, manifest)
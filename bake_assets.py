@@ -0,0 +1,217 @@
+"""Bake tiles, buildings, NPCs and spritesheets into a pre-scaled texture atlas.
+
+    python bake_assets.py [--out assets] [--cache-dir .bake_cache] [--workers N] [--force]
+
+Each input is scaled (and sliced, for spritesheets) in a worker process. Results
+are cached by content hash, so only changed inputs are reprocessed.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+
+from atlas import ATLAS_DIR, ATLAS_VERSION, encode_mask, sheet_key
+from level import (
+    BUILDING_SCALES, CROWD_SCALE, FRAME_SIZE, IDLE_SHEET, NPC_FILES, NPC_SCALE, PLAYER_SCALE, RUN_SHEET, TILE_SIZE,
+)
+from walkmap import build_tile_mask
+
+# Sizes come from level.py, so the bake always matches what the game loads
+SPRITESHEETS = [IDLE_SHEET, RUN_SHEET]
+SHEET_SCALES = sorted({PLAYER_SCALE, CROWD_SCALE})
+MAX_ATLAS_WIDTH = 2048
+CACHE_DIR = ".bake_cache"
+
+
+# --- Jobs ---
+def asset_jobs():
+    jobs = []
+    for i in range(1, 59):
+        path = f"tiles/tile{i}.png"
+        if os.path.exists(path):
+            jobs.append(("tile", str(i), path, (TILE_SIZE, TILE_SIZE)))
+    for name, (sx, sy) in BUILDING_SCALES.items():
+        path = f"{name}.png"
+        if os.path.exists(path):
+            jobs.append(("image", name, path, (int(TILE_SIZE * sx), int(TILE_SIZE * sy))))
+    for path in NPC_FILES.values():
+        if os.path.exists(path):
+            size = (int(TILE_SIZE * NPC_SCALE[0]), int(TILE_SIZE * NPC_SCALE[1]))
+            jobs.append(("image", path, path, size))
+    for path in SPRITESHEETS:
+        if os.path.exists(path):
+            for scale in SHEET_SCALES:
+                jobs.append(("sheet", sheet_key(path, scale), path, (*FRAME_SIZE, scale)))
+    return jobs
+
+
+def job_id(job):
+    kind, key, _, _ = job
+    return f"{kind}:{key}"
+
+
+def job_hash(job):
+    kind, key, path, params = job
+    digest = hashlib.sha256()
+    digest.update(json.dumps([ATLAS_VERSION, kind, key, list(params)]).encode("utf-8"))
+    with open(path, "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def bake_job(job):
+    # Runs in a worker process; returns plain bytes so results pickle cheaply
+    kind, key, path, params = job
+    source = pygame.image.load(path)
+
+    if kind == "sheet":
+        frame_width, frame_height, scale = params
+        size = (int(frame_width * scale), int(frame_height * scale))
+        rows = source.get_height() // frame_height
+        cols = source.get_width() // frame_width
+        images = []
+        frame_rows = []
+        for r in range(rows):
+            row_frames = []
+            for c in range(cols):
+                frame_rect = pygame.Rect(c * frame_width, r * frame_height, frame_width, frame_height)
+                frame = source.subsurface(frame_rect).copy()
+                if not pygame.mask.from_surface(frame).count():
+                    continue
+                frame = pygame.transform.scale(frame, size)
+                row_frames.append(len(images))
+                images.append((size, pygame.image.tobytes(frame, "RGBA")))
+            frame_rows.append(row_frames)
+        return {"images": images, "rows": frame_rows, "walk": None}
+
+    img = pygame.transform.scale(source, params)
+    walk = build_tile_mask(img) if kind == "tile" else None
+    return {"images": [(params, pygame.image.tobytes(img, "RGBA"))], "rows": None, "walk": walk}
+
+
+# --- Packing ---
+def pack(sizes, max_width=MAX_ATLAS_WIDTH):
+    # Shelf packer: tallest first, left to right, new shelf when the row is full
+    max_width = max([max_width] + [w for w, _ in sizes])
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    positions = [None] * len(sizes)
+    x = y = shelf_height = width = 0
+    for i in order:
+        w, h = sizes[i]
+        if x + w > max_width:
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        positions[i] = (x, y)
+        x += w
+        shelf_height = max(shelf_height, h)
+        width = max(width, x)
+    return positions, (width, y + shelf_height)
+
+
+def compose(images, positions, size):
+    width, height = size
+    pixels = bytearray(width * height * 4)
+    for ((w, h), data), (x, y) in zip(images, positions):
+        for row in range(h):
+            start = ((y + row) * width + x) * 4
+            pixels[start:start + w * 4] = data[row * w * 4:(row + 1) * w * 4]
+    return pygame.image.frombytes(bytes(pixels), size, "RGBA")
+
+
+# --- Bake ---
+def bake(out_dir=ATLAS_DIR, cache_dir=CACHE_DIR, workers=None, force=False):
+    manifest_path = os.path.join(out_dir, "atlas.json")
+    atlas_path = os.path.join(out_dir, "atlas.png")
+    os.makedirs(out_dir, exist_ok=True)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    jobs = asset_jobs()
+    hashes = {job_id(job): job_hash(job) for job in jobs}
+
+    if not force and os.path.exists(manifest_path) and os.path.exists(atlas_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous.get("version") == ATLAS_VERSION and previous.get("sources") == hashes:
+            print(f"{manifest_path} is up to date ({len(jobs)} inputs)")
+            return False
+
+    results = {}
+    pending = []
+    for job in jobs:
+        cache_path = os.path.join(cache_dir, hashes[job_id(job)] + ".pickle")
+        if not force and os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                results[job_id(job)] = pickle.load(f)
+        else:
+            pending.append(job)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for job, result in zip(pending, pool.map(bake_job, pending)):
+                results[job_id(job)] = result
+                with open(os.path.join(cache_dir, hashes[job_id(job)] + ".pickle"), "wb") as f:
+                    pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    images = []
+    for job in jobs:
+        images.extend(results[job_id(job)]["images"])
+    positions, atlas_size = pack([size for size, _ in images])
+    pygame.image.save(compose(images, positions, atlas_size), atlas_path)
+
+    manifest = {
+        "version": ATLAS_VERSION,
+        "atlas": os.path.basename(atlas_path),
+        "size": list(atlas_size),
+        "tile_size": TILE_SIZE,
+        "sources": hashes,
+        "tiles": {},
+        "images": {},
+        "sheets": {},
+    }
+    index = 0
+    for job in jobs:
+        kind, key, _, _ = job
+        result = results[job_id(job)]
+        rects = []
+        for size, _ in result["images"]:
+            rects.append([*positions[index], *size])
+            index += 1
+        if kind == "tile":
+            manifest["tiles"][key] = {"rect": rects[0], "walk": encode_mask(result["walk"])}
+        elif kind == "image":
+            manifest["images"][key] = {"rect": rects[0]}
+        else:
+            manifest["sheets"][key] = {"rows": [[rects[i] for i in row] for row in result["rows"]]}
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+
+    print(f"Baked {len(pending)}/{len(jobs)} inputs ({len(jobs) - len(pending)} cached) "
+          f"into {atlas_path} ({atlas_size[0]}x{atlas_size[1]}, {len(images)} images)")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bake game assets into a pre-scaled texture atlas.")
+    parser.add_argument("--out", default=ATLAS_DIR, help="output directory (default: %(default)s)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="per-input bake cache (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="ignore the cache and rebake everything")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    bake(args.out, args.cache_dir, args.workers, args.force)
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Headless benchmark: play a scripted run of the game and report frame timings as JSON.
+
+    python benchmark.py [--fps 0] [--out results.json]
+
+The script walks the fork, talks to all three NPCs and reads the journal,
+under the SDL dummy video driver so it runs on any Linux box.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+
+from controls import ScriptedInput
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+UP, DOWN, LEFT, RIGHT = pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT
+DIALOGUE_LINES = 4
+
+
+def talk():
+    # One press opens the dialogue, one per line closes it
+    return [("press", pygame.K_SPACE)] * (DIALOGUE_LINES + 1)
+
+
+# Frame counts assume PLAYER_SPEED pixels per simulation tick, one tick per frame
+ROUTE = [
+    ("hold", (UP,), 70),
+    ("hold", (LEFT,), 144),
+    ("hold", (UP,), 40),
+    *talk(),
+    ("hold", (DOWN,), 40),
+    ("hold", (RIGHT,), 128),
+    ("hold", (UP,), 40),
+    *talk(),
+    ("hold", (DOWN,), 40),
+    ("hold", (RIGHT,), 128),
+    ("hold", (UP,), 40),
+    *talk(),
+    ("wait", 120),
+    ("press", pygame.K_SPACE),
+    ("wait", 30),
+]
+
+
+class TimedInput(ScriptedInput):
+    # Each poll marks a frame boundary, so the intervals cover the whole loop body
+    def __init__(self, script):
+        super().__init__(script)
+        self.frame_times = []
+        self.first = None
+        self.last = None
+
+    def poll(self):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.frame_times.append(now - self.last)
+        else:
+            self.first = now
+        self.last = now
+        return super().poll()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(frame_times):
+    ms = sorted(t * 1000 for t in frame_times)
+    return {
+        "mean": statistics.fmean(ms) if ms else 0.0,
+        "p50": percentile(ms, 50),
+        "p95": percentile(ms, 95),
+        "p99": percentile(ms, 99),
+        "max": ms[-1] if ms else 0.0,
+    }
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run(fps=0, script=ROUTE):
+    from main import main
+
+    controls = TimedInput(script)
+    start = time.perf_counter()
+    state = asyncio.run(main(controls=controls, fps=fps, lockstep=True))
+    total = time.perf_counter() - start
+    timings = state.pop("timings", {})
+    frames = state.pop("frames", {})
+    textures = state.pop("textures", {})
+
+    return {
+        "frames": len(controls.frame_times),
+        "total_s": total,
+        "startup_s": controls.first - start,
+        "loading_screen_s": timings.get("loading_screen_ms", 0.0) / 1000,
+        "time_to_first_frame_s": timings.get("first_frame_ms", 0.0) / 1000,
+        "fully_loaded_s": timings.get("loaded_ms", 0.0) / 1000,
+        "rendered_frames": frames.get("rendered", 0),
+        "skipped_frames": frames.get("skipped", 0),
+        "frame_ms": summarize(controls.frame_times),
+        "peak_rss_kb": peak_rss_kb(),
+        "textures": textures,
+        "completed": len(state["talked_to"]) == 3,
+        "final_state": state,
+        "video_driver": os.environ["SDL_VIDEODRIVER"],
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the scripted headless benchmark.")
+    parser.add_argument("--fps", type=int, default=0, help="frame cap, 0 for uncapped (default: %(default)s)")
+    parser.add_argument("--out", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.fps)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0 if report["completed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
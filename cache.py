@@ -0,0 +1,65 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key):
+        value = self.items.get(key)
+        if value is not None:
+            self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.items.clear()
+
+    def __len__(self):
+        return len(self.items)
+
+
+class ByteBudgetCache:
+    # LRU bounded by the total size of its values instead of their count;
+    # size_of gives a value's size in bytes. The newest entry is always kept.
+    def __init__(self, max_bytes, size_of):
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self.items = OrderedDict()
+        self.sizes = {}
+        self.bytes = 0
+        self.evictions = 0
+
+    def get(self, key):
+        value = self.items.get(key)
+        if value is not None:
+            self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if key in self.items:
+            self.bytes -= self.sizes[key]
+        self.items[key] = value
+        self.items.move_to_end(key)
+        self.sizes[key] = self.size_of(value)
+        self.bytes += self.sizes[key]
+        while self.bytes > self.max_bytes and len(self.items) > 1:
+            old_key, _ = self.items.popitem(last=False)
+            self.bytes -= self.sizes.pop(old_key)
+            self.evictions += 1
+
+    def clear(self):
+        self.items.clear()
+        self.sizes.clear()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self.items)
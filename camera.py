@@ -0,0 +1,83 @@
+import math
+
+import pygame
+
+# Multiples of 1/8, so tiles, chunks and character frames scale to whole pixels
+ZOOM_LEVELS = (0.5, 0.625, 0.75, 0.875, 1.0, 1.25, 1.5, 1.75, 2.0)
+ZOOM_STEP_MS = 40  # Time spent on each level while zooming
+
+
+# --- Camera ---
+class Camera:
+    # x, y is the world position of the viewport's top-left corner; width and
+    # height are screen pixels, which cover width / zoom world pixels
+    def __init__(self, size, bounds=None):
+        self.width, self.height = size
+        self.bounds = bounds
+        self.x = 0
+        self.y = 0
+        self.zoom_index = ZOOM_LEVELS.index(1.0)
+        self.target_zoom_index = self.zoom_index
+        self.zoom_timer = 0.0
+
+    @property
+    def zoom(self):
+        return ZOOM_LEVELS[self.zoom_index]
+
+    @property
+    def view_size(self):
+        # World pixels on screen
+        return math.ceil(self.width / self.zoom), math.ceil(self.height / self.zoom)
+
+    @property
+    def rect(self):
+        return pygame.Rect(self.x, self.y, *self.view_size)
+
+    def zoom_by(self, steps):
+        self.target_zoom_index = max(0, min(len(ZOOM_LEVELS) - 1, self.target_zoom_index + steps))
+
+    def update_zoom(self, dt):
+        # Walks one level at a time towards the target, so zooming looks smooth
+        if self.zoom_index == self.target_zoom_index:
+            self.zoom_timer = 0.0
+            return
+        self.zoom_timer += dt
+        while self.zoom_timer >= ZOOM_STEP_MS and self.zoom_index != self.target_zoom_index:
+            self.zoom_timer -= ZOOM_STEP_MS
+            self.zoom_index += 1 if self.target_zoom_index > self.zoom_index else -1
+
+    def resize(self, size):
+        self.width, self.height = size
+
+    def clamp_axis(self, center, view, low, length):
+        # Maps narrower than the viewport stay centred instead of scrolling
+        if length <= view:
+            return low + (length - view) // 2
+        return max(low, min(center - view // 2, low + length - view))
+
+    def follow(self, target):
+        center_x, center_y = target
+        view_width, view_height = self.view_size
+        if self.bounds is None:
+            self.x = center_x - view_width // 2
+            self.y = center_y - view_height // 2
+            return
+        self.x = self.clamp_axis(center_x, view_width, self.bounds.x, self.bounds.width)
+        self.y = self.clamp_axis(center_y, view_height, self.bounds.y, self.bounds.height)
+
+    def apply(self, rect):
+        # World rect to screen rect
+        zoom = self.zoom
+        if zoom == 1:
+            return rect.move(-self.x, -self.y)
+        left = round((rect.left - self.x) * zoom)
+        top = round((rect.top - self.y) * zoom)
+        right = round((rect.right - self.x) * zoom)
+        bottom = round((rect.bottom - self.y) * zoom)
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def to_world(self, pos):
+        zoom = self.zoom
+        if zoom == 1:
+            return pos[0] + self.x, pos[1] + self.y
+        return math.floor(pos[0] / zoom) + self.x, math.floor(pos[1] / zoom) + self.y
@@ -0,0 +1,63 @@
+import pygame
+
+from animation import animation_cache
+
+RUN_FRAME_MS = 100
+IDLE_FRAME_MS = 200
+
+
+# --- Character ---
+class Character:
+    def __init__(self, idle_sheet, run_sheet, frame_size, pos, scale=1.5, atlas=None):
+        self.scale = scale
+        self.idle_animation = animation_cache.get(idle_sheet, frame_size, scale, atlas)
+        self.run_animation = animation_cache.get(run_sheet, frame_size, scale, atlas)
+        self.frame_width, self.frame_height = int(frame_size[0] * scale), int(frame_size[1] * scale)
+        self.sprite_rect = pygame.Rect(pos[0], pos[1], self.frame_width, self.frame_height)
+
+        hitbox_width = int(self.frame_width * 0.4)
+        hitbox_height = int(self.frame_height * 0.2)
+        hitbox_x = pos[0] + (self.frame_width - hitbox_width) // 2
+        hitbox_y = pos[1] + (self.frame_height - hitbox_height)
+        self.rect = pygame.Rect(hitbox_x, hitbox_y, hitbox_width, hitbox_height)
+        self.previous_pos = self.rect.midbottom
+
+        self.direction = 0
+        self.anim_timer = 0
+        self.frame_index = 0
+        self.state = "idle"
+
+        if self.idle_animation.first_frame:
+            self.image = self.idle_animation.first_frame
+        else:
+            self.image = pygame.Surface((self.frame_width, self.frame_height), pygame.SRCALPHA)
+            self.image.fill((255, 0, 0, 150))
+
+    def update(self, dt, moving, direction):
+        if moving:
+            self.state = "run"
+            self.direction = direction
+            animation, frame_ms = self.run_animation, RUN_FRAME_MS
+        else:
+            self.state = "idle"
+            animation, frame_ms = self.idle_animation, IDLE_FRAME_MS
+
+        self.anim_timer += dt
+        if self.anim_timer >= frame_ms:
+            self.anim_timer = 0
+            self.frame_index += 1
+
+        frames = animation.directions[self.direction]
+        if not frames:
+            return
+        if self.frame_index >= len(frames):
+            self.frame_index = 0
+
+        self.image = frames[self.frame_index]
+        self.sprite_rect.midbottom = self.rect.midbottom
+
+    def interpolate(self, alpha):
+        # Place the sprite between the last two simulation ticks
+        prev_x, prev_y = self.previous_pos
+        x, y = self.rect.midbottom
+        self.sprite_rect.midbottom = (round(prev_x + (x - prev_x) * alpha), round(prev_y + (y - prev_y) * alpha))
@@ -0,0 +1,52 @@
+import pygame
+
+
+# --- Input Sources ---
+class KeyboardInput:
+    def poll(self):
+        return pygame.event.get(), pygame.key.get_pressed()
+
+
+class HeldKeys:
+    # Stands in for pygame.key.get_pressed() when input is synthesised
+    def __init__(self, keys=()):
+        self.keys = frozenset(keys)
+
+    def __getitem__(self, key):
+        return key in self.keys
+
+
+class ScriptedInput:
+    # Script steps: ("hold", keys, frames), ("press", key), ("click", pos) or ("wait", frames).
+    # Once the script runs out a QUIT event is posted.
+    def __init__(self, script):
+        self.frames = list(self.expand(script))
+        self.frame = 0
+
+    @staticmethod
+    def expand(script):
+        for step in script:
+            if step[0] == "hold":
+                _, keys, frames = step
+                for _ in range(frames):
+                    yield [], HeldKeys(keys)
+            elif step[0] == "press":
+                event = pygame.event.Event(pygame.KEYDOWN, key=step[1], mod=0, unicode="", scancode=0)
+                yield [event], HeldKeys()
+            elif step[0] == "click":
+                event = pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=step[1], button=1)
+                yield [event], HeldKeys()
+            elif step[0] == "wait":
+                for _ in range(step[1]):
+                    yield [], HeldKeys()
+
+    def done(self):
+        return self.frame >= len(self.frames)
+
+    def poll(self):
+        pygame.event.pump()
+        if self.done():
+            return [pygame.event.Event(pygame.QUIT)], HeldKeys()
+        events, keys = self.frames[self.frame]
+        self.frame += 1
+        return events, keys
@@ -0,0 +1,173 @@
+import numpy as np
+
+from animation import DIRECTION_STEPS, animation_cache
+from character import IDLE_FRAME_MS, RUN_FRAME_MS
+from flowfield import NO_STEP
+from render import scaled_surfaces
+from spatial import overlaps_any, rect_array
+
+STEPS = np.array(DIRECTION_STEPS, dtype=float)
+WALK_CHANCE = 0.8  # Otherwise a walker stands idle until its next decision
+DECISION_MS = (800, 3000)
+ROUTED_SHARE = 0.3  # Walkers heading for a destination instead of wandering
+ARRIVE_CELLS = 3  # Flow-field distance that counts as arrived
+SPAWN_ATTEMPTS = 50
+
+
+# --- Crowd ---
+class Crowd:
+    # Struct-of-arrays state for many wandering walkers; one step moves and collides them all
+    def __init__(self, count, walk_map, colliders, idle_sheet, run_sheet, frame_size,
+                 scale=2, speed=1.5, seed=0, atlas=None, flow_fields=None, destinations=()):
+        self.walk_map = walk_map
+        self.flow_fields = flow_fields
+        self.destinations = list(destinations) if flow_fields else []
+        self.idle_animation = animation_cache.get(idle_sheet, frame_size, scale, atlas)
+        self.run_animation = animation_cache.get(run_sheet, frame_size, scale, atlas)
+        self.frame_width, self.frame_height = int(frame_size[0] * scale), int(frame_size[1] * scale)
+        self.speed = speed
+        self.rng = np.random.default_rng(seed)
+
+        self.colliders = rect_array(colliders)
+
+        hitbox = (int(self.frame_width * 0.4), int(self.frame_height * 0.2))
+        self.pos = self.spawn(count, hitbox)  # Hitbox top-left, float pixels
+        count = len(self.pos)
+        self.size = np.tile(np.array(hitbox, dtype=np.intp), (count, 1))
+        self.previous = self.pos.copy()
+        self.velocity = np.zeros((count, 2))
+        self.direction = np.zeros(count, dtype=np.intp)
+        self.moving = np.zeros(count, dtype=bool)
+        self.timer = np.zeros(count)
+        self.anim_time = self.rng.uniform(0, 1000, count)
+
+        # Index into destinations, -1 wanders
+        self.goal = np.full(count, -1, dtype=np.intp)
+        if self.destinations:
+            routed = self.rng.random(count) < ROUTED_SHARE
+            self.goal[routed] = self.rng.integers(0, len(self.destinations), np.count_nonzero(routed))
+
+    def __len__(self):
+        return len(self.pos)
+
+    def spawn(self, count, hitbox):
+        # Rejection-sample free spots inside the walk map
+        walk_map = self.walk_map
+        low = np.array([walk_map.origin_x, walk_map.origin_y], dtype=float)
+        high = low + (walk_map.cols * walk_map.tile_size - hitbox[0], walk_map.rows * walk_map.tile_size - hitbox[1])
+        size = np.array(hitbox, dtype=np.intp)
+        placed = []
+        found = 0
+        for _ in range(SPAWN_ATTEMPTS):
+            if found >= count or (high <= low).any():
+                break
+            candidates = np.floor(self.rng.uniform(low, high, (max(64, (count - found) * 4), 2)))
+            candidates = candidates[self.can_occupy(candidates, np.broadcast_to(size, candidates.shape))]
+            placed.append(candidates[:count - found])
+            found += len(placed[-1])
+        return np.concatenate(placed) if placed else np.zeros((0, 2))
+
+    def can_occupy(self, pos, size):
+        lefts = np.floor(pos[:, 0]).astype(np.intp)
+        tops = np.floor(pos[:, 1]).astype(np.intp)
+        widths, heights = size[:, 0], size[:, 1]
+        free = self.walk_map.can_move_many(lefts, tops, widths, heights)
+        return free & ~overlaps_any(lefts, tops, widths, heights, self.colliders)
+
+    def choose(self, mask):
+        count = np.count_nonzero(mask)
+        if not count:
+            return
+        self.direction[mask] = self.rng.integers(0, len(STEPS), count)
+        self.moving[mask] = self.rng.random(count) < WALK_CHANCE
+        self.velocity[mask] = STEPS[self.direction[mask]] * (self.speed * self.moving[mask])[:, None]
+        self.timer[mask] = self.rng.uniform(*DECISION_MS, count)
+
+    def route(self, mask):
+        # Routed walkers steer along the flow field of their destination
+        centers = self.pos + self.size / 2
+        for goal, destination in enumerate(self.destinations):
+            walkers = np.flatnonzero(mask & (self.goal == goal))
+            if not len(walkers):
+                continue
+            field = self.flow_fields.field_to(destination)
+            if field is None:
+                self.goal[walkers] = -1
+                continue
+            xs, ys = centers[walkers, 0], centers[walkers, 1]
+            distance = self.flow_fields.distances(field, xs, ys)
+            velocity_x, velocity_y, steps = self.flow_fields.steer(field, xs, ys, self.speed)
+
+            # Walkers with no way onto the field give up and wander
+            self.goal[walkers[(steps == NO_STEP) & (distance < 0)]] = -1
+
+            # Arrivals stand still for a while, then set off for another destination
+            arrived = walkers[(distance >= 0) & (distance <= ARRIVE_CELLS)]
+            if len(arrived):
+                offset = self.rng.integers(1, max(len(self.destinations), 2), len(arrived))
+                self.goal[arrived] = (goal + offset) % len(self.destinations)
+                self.moving[arrived] = False
+                self.velocity[arrived] = 0
+                self.timer[arrived] = self.rng.uniform(*DECISION_MS, len(arrived))
+
+            walking = (steps != NO_STEP) & ((distance > ARRIVE_CELLS) | (distance < 0))
+            walkers = walkers[walking]
+            self.direction[walkers] = steps[walking]
+            self.moving[walkers] = True
+            self.velocity[walkers, 0] = velocity_x[walking]
+            self.velocity[walkers, 1] = velocity_y[walking]
+
+    def step(self, dt):
+        self.previous[:] = self.pos
+        self.timer -= dt
+        self.anim_time += dt
+        expired = self.timer <= 0
+        self.choose(expired & (self.goal < 0))
+        if self.destinations:
+            self.route(expired & (self.goal >= 0))
+
+        target = self.pos + self.velocity
+        free = self.can_occupy(target, self.size)
+        self.pos[free] = target[free]
+        # Walkers that hit a wall or a building pick a new heading straight away;
+        # routed walkers follow it as a short detour before rejoining their field
+        self.choose(self.moving & ~free)
+
+    def sprites(self, camera, alpha=1.0):
+        # (frame, screen position, depth) for the walkers on screen, back to
+        # front. depth is the world y of the feet, for RenderQueue
+        pos = self.previous + (self.pos - self.previous) * alpha
+        feet_x = pos[:, 0] + self.size[:, 0] // 2
+        feet_y = pos[:, 1] + self.size[:, 1]
+        depths = np.rint(feet_y).astype(np.intp)
+        xs = np.rint(feet_x - self.frame_width // 2).astype(np.intp) - camera.x
+        ys = np.rint(feet_y - self.frame_height).astype(np.intp) - camera.y
+        zoom = camera.zoom
+        frame_width, frame_height = self.frame_width, self.frame_height
+        if zoom != 1:
+            xs = np.rint(xs * zoom).astype(np.intp)
+            ys = np.rint(ys * zoom).astype(np.intp)
+            frame_width, frame_height = round(frame_width * zoom), round(frame_height * zoom)
+
+        visible = np.flatnonzero(
+            (xs < camera.width) & (xs + frame_width > 0)
+            & (ys < camera.height) & (ys + frame_height > 0)
+        )
+        visible = visible[np.argsort(feet_y[visible], kind="stable")]
+
+        blits = []
+        idle, run = self.idle_animation.directions, self.run_animation.directions
+        for x, y, depth, direction, moving, anim_time in zip(
+            xs[visible].tolist(), ys[visible].tolist(), depths[visible].tolist(),
+            self.direction[visible].tolist(), self.moving[visible].tolist(), self.anim_time[visible].tolist(),
+        ):
+            frames = run[direction] if moving else idle[direction]
+            if not frames:
+                continue
+            frame_ms = RUN_FRAME_MS if moving else IDLE_FRAME_MS
+            frame = frames[int(anim_time // frame_ms) % len(frames)]
+            if zoom != 1:
+                blits.append((*scaled_surfaces.sprite(frame, zoom, (x, y)), depth))
+            else:
+                blits.append((frame, (x, y), depth))
+        return blits
@@ -0,0 +1,75 @@
+import pygame
+
+NATIVE = "native"    # Draw straight into the window; its size is the render size
+SCALED = "scaled"    # SDL scales the logical surface to the window (pygame.SCALED)
+LOGICAL = "logical"  # Draw offscreen at the logical size, one letterboxed scale per present
+MODES = (NATIVE, SCALED, LOGICAL)
+
+
+# --- Display / Render Target ---
+class Display:
+    def __init__(self, logical_size, mode=NATIVE):
+        if mode not in MODES:
+            raise ValueError(f"Unknown display mode {mode!r}, expected one of {MODES}")
+        self.logical_size = logical_size
+        self.mode = mode
+
+        flags = pygame.RESIZABLE
+        if mode == SCALED:
+            flags |= pygame.SCALED
+        self.window = pygame.display.set_mode(logical_size, flags)
+
+        if mode == LOGICAL:
+            self.surface = pygame.Surface(logical_size).convert()
+        else:
+            self.surface = self.window
+        self.viewport = None
+        self.bars = []
+        self.resize()
+
+    def resize(self):
+        # Call on VIDEORESIZE; recomputes the letterboxed viewport
+        self.window = pygame.display.get_surface()
+        if self.mode != LOGICAL:
+            self.surface = self.window
+            return
+
+        window_w, window_h = self.window.get_size()
+        logical_w, logical_h = self.logical_size
+        scale = min(window_w / logical_w, window_h / logical_h)
+        size = (max(1, int(logical_w * scale)), max(1, int(logical_h * scale)))
+        self.viewport = pygame.Rect((0, 0), size)
+        self.viewport.center = self.window.get_rect().center
+
+        window_rect = self.window.get_rect()
+        self.bars = [
+            pygame.Rect(0, 0, window_w, self.viewport.top),
+            pygame.Rect(0, self.viewport.bottom, window_w, window_h - self.viewport.bottom),
+            pygame.Rect(0, 0, self.viewport.left, window_h),
+            pygame.Rect(self.viewport.right, 0, window_w - self.viewport.right, window_h),
+        ]
+        self.bars = [bar.clip(window_rect) for bar in self.bars if bar.width > 0 and bar.height > 0]
+
+    def present(self, rects=None):
+        if self.mode != LOGICAL:
+            if rects is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(rects)
+            return
+
+        for bar in self.bars:
+            self.window.fill((0, 0, 0), bar)
+        if self.viewport.size == self.logical_size:
+            self.window.blit(self.surface, self.viewport)
+        else:
+            pygame.transform.scale(self.surface, self.viewport.size, self.window.subsurface(self.viewport))
+        pygame.display.flip()
+
+    def to_logical(self, pos):
+        # Window pixel -> logical pixel, e.g. for mouse input
+        if self.mode != LOGICAL:
+            return pos
+        x = (pos[0] - self.viewport.x) * self.logical_size[0] / self.viewport.width
+        y = (pos[1] - self.viewport.y) * self.logical_size[1] / self.viewport.height
+        return int(x), int(y)
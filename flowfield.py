@@ -0,0 +1,159 @@
+from collections import deque
+
+import numpy as np
+
+from animation import DIRECTION_STEPS
+from cache import LRUCache
+from spatial import overlaps_any, rect_array
+
+UNREACHABLE = -1
+NO_STEP = -1  # Direction at the goal itself and in unreachable cells
+STEPS = np.array(DIRECTION_STEPS, dtype=float)
+
+
+# --- Flow Field ---
+class FlowField:
+    # BFS outward from one goal cell; every reachable cell stores the step towards it
+    def __init__(self, walkable, goal, version=0):
+        rows, cols = walkable.shape
+        self.goal = goal
+        self.version = version  # FlowFields.version of the grid it was built on
+        self.distance = np.full((rows, cols), UNREACHABLE, dtype=np.int32)
+        self.direction = np.full((rows, cols), NO_STEP, dtype=np.int8)
+
+        goal_col, goal_row = goal
+        self.distance[goal_row, goal_col] = 0
+        frontier = deque([(goal_col, goal_row)])
+        # Reaching a neighbour through step d means walking back along d, the opposite row
+        back = [DIRECTION_STEPS.index((-dx, -dy)) for dx, dy in DIRECTION_STEPS]
+        while frontier:
+            col, row = frontier.popleft()
+            distance = self.distance[row, col] + 1
+            for d, (dx, dy) in enumerate(DIRECTION_STEPS):
+                c, r = col + dx, row + dy
+                if 0 <= c < cols and 0 <= r < rows and walkable[r, c] and self.distance[r, c] == UNREACHABLE:
+                    self.distance[r, c] = distance
+                    self.direction[r, c] = back[d]
+                    frontier.append((c, r))
+
+
+class FlowFields:
+    # Flow fields over a coarse walk grid, cached per goal cell until the map changes
+    def __init__(self, walk_map, agent_size, colliders=(), cell_size=32, max_fields=32):
+        self.walk_map = walk_map
+        self.agent_size = agent_size
+        self.colliders = rect_array(colliders)
+        self.cell_size = cell_size
+        self.fields = LRUCache(max_fields)
+        self.walkable = self.build_grid()
+        self.version = 0
+
+    def build_grid(self):
+        # A cell is walkable when an agent hitbox centred on it clears the walk masks and colliders
+        walk_map = self.walk_map
+        rows = walk_map.rows * walk_map.tile_size // self.cell_size
+        cols = walk_map.cols * walk_map.tile_size // self.cell_size
+        center_y, center_x = np.mgrid[0:rows, 0:cols] * self.cell_size + self.cell_size // 2
+        width, height = self.agent_size
+        lefts = (center_x + walk_map.origin_x - width // 2).ravel()
+        tops = (center_y + walk_map.origin_y - height // 2).ravel()
+        widths, heights = np.full(lefts.shape, width), np.full(lefts.shape, height)
+        walkable = walk_map.can_move_many(lefts, tops, widths, heights)
+        walkable &= ~overlaps_any(lefts, tops, widths, heights, self.colliders)
+        return walkable.reshape(rows, cols)
+
+    def invalidate(self):
+        # Call after the tile map or colliders change
+        self.walkable = self.build_grid()
+        self.fields.clear()
+        self.version += 1
+
+    def cell(self, x, y):
+        return (int(x - self.walk_map.origin_x) // self.cell_size, int(y - self.walk_map.origin_y) // self.cell_size)
+
+    def nearest_walkable(self, cell):
+        rows, cols = self.walkable.shape
+        col, row = cell
+        if 0 <= col < cols and 0 <= row < rows and self.walkable[row, col]:
+            return cell
+        candidates = np.argwhere(self.walkable)
+        if not len(candidates):
+            return None
+        best = np.argmin((candidates[:, 0] - row) ** 2 + (candidates[:, 1] - col) ** 2)
+        return int(candidates[best, 1]), int(candidates[best, 0])
+
+    def field_to(self, pos):
+        # Cached by the requested cell; goals on blocked cells snap to the closest walkable one
+        cell = self.cell(*pos)
+        field = self.fields.get(cell)
+        if field is None:
+            goal = self.nearest_walkable(cell)
+            if goal is None:
+                return None
+            field = FlowField(self.walkable, goal, self.version)
+            self.fields.put(cell, field)
+        return field
+
+    def sample(self, grid, xs, ys, outside):
+        cols = (np.asarray(xs) - self.walk_map.origin_x) // self.cell_size
+        rows = (np.asarray(ys) - self.walk_map.origin_y) // self.cell_size
+        height, width = grid.shape
+        inside = (cols >= 0) & (rows >= 0) & (cols < width) & (rows < height)
+        values = grid[np.where(inside, rows, 0).astype(np.intp), np.where(inside, cols, 0).astype(np.intp)]
+        return np.where(inside, values, outside)
+
+    def directions(self, field, xs, ys):
+        return self.sample(field.direction, xs, ys, NO_STEP)
+
+    def distances(self, field, xs, ys):
+        return self.sample(field.distance, xs, ys, UNREACHABLE)
+
+    def steer(self, field, xs, ys, speed):
+        # Velocity along the field for agents centred at xs, ys. The grid was only checked
+        # for hitboxes centred in a cell, so agents first slide back to the middle of their lane.
+        xs, ys = np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)
+        steps = self.directions(field, xs, ys)
+
+        # Agents standing on a cell their hitbox doesn't fit head for the nearest neighbour on the field
+        stranded = self.distances(field, xs, ys) == UNREACHABLE
+        if stranded.any():
+            size = self.cell_size
+            around = np.stack([
+                self.distances(field, xs[stranded] + dx * size, ys[stranded] + dy * size) for dx, dy in DIRECTION_STEPS
+            ]).astype(float)
+            around[around == UNREACHABLE] = np.inf
+            best = np.argmin(around, axis=0)
+            steps[stranded] = np.where(np.isfinite(around.min(axis=0)), best, NO_STEP)
+        step_x, step_y = STEPS[steps].T * (steps >= 0)
+        velocity_x, velocity_y = step_x * speed, step_y * speed
+
+        half = self.cell_size // 2
+        offset_x = (xs - self.walk_map.origin_x) // self.cell_size * self.cell_size + half + self.walk_map.origin_x - xs
+        offset_y = (ys - self.walk_map.origin_y) // self.cell_size * self.cell_size + half + self.walk_map.origin_y - ys
+        drift_x = (step_y != 0) & (np.abs(offset_x) >= 1)
+        drift_y = (step_x != 0) & (np.abs(offset_y) >= 1)
+        velocity_x = np.where(drift_x, np.clip(offset_x, -speed, speed), velocity_x)
+        velocity_y = np.where(drift_x, 0, velocity_y)
+        velocity_y = np.where(drift_y, np.clip(offset_y, -speed, speed), velocity_y)
+        velocity_x = np.where(drift_y, 0, velocity_x)
+        return velocity_x, velocity_y, steps
+
+    def walk_step(self, field, rect, speed, is_free):
+        # Single-agent steering: (dx, dy, direction), or None once arrived or stuck. Falls back
+        # to the free unit step heading for the cell closest to the goal when steer is blocked.
+        velocity_x, velocity_y, steps = self.steer(field, [rect.centerx], [rect.centery], speed)
+        if steps[0] == NO_STEP:
+            return None
+        dx, dy = int(velocity_x[0]), int(velocity_y[0])
+        if is_free(rect.move(dx, dy)):
+            return dx, dy, int(steps[0])
+
+        here = self.distances(field, [rect.centerx], [rect.centery])[0]
+        best = None
+        for direction, (step_x, step_y) in enumerate(DIRECTION_STEPS):
+            ahead = self.distances(field, [rect.centerx + step_x * self.cell_size], [rect.centery + step_y * self.cell_size])[0]
+            if ahead == UNREACHABLE or (here != UNREACHABLE and ahead >= here):
+                continue
+            if (best is None or ahead < best[0]) and is_free(rect.move(step_x * speed, step_y * speed)):
+                best = (ahead, step_x * speed, step_y * speed, direction)
+        return best[1:] if best else None
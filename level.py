@@ -0,0 +1,287 @@
+import os
+from functools import partial
+
+import pygame
+
+from animation import animation_cache
+from atlas import load_atlas
+from character import Character
+from flowfield import FlowFields
+from loader import FIRST_SCREEN, STREAMED, AssetLoader
+from mapfile import load_map
+from render import GRASS_TILE
+from spatial import SpatialHash
+from textures import texture_budget
+from walkmap import WalkMap, build_tile_mask
+
+# --- Tile Scaling ---
+BASE_TILE_SIZE = 64
+SCALE = 2
+TILE_SIZE = BASE_TILE_SIZE * SCALE
+
+MAP_PATH = "maps/fork.map"  # python mapfile.py maps/fork.txt maps/fork.map
+VIEW_SIZE = (1200, 800)  # The map is centred in this view, which fixes world coordinates
+PATH_TILE = 14
+
+# --- Player ---
+FRAME_SIZE = (64, 64)
+IDLE_SHEET = "Unarmed_Idle_without_shadow.png"
+RUN_SHEET = "Unarmed_Run_without_shadow.png"
+PLAYER_SCALE = 3
+CROWD_SCALE = 2
+
+BUILDING_NAMES = ["cathedral", "mosque", "synagogue"]
+BUILDING_SCALES = {"cathedral": (1.5, 1.7), "mosque": (1.7, 1.7), "synagogue": (1.6, 1.8)}  # In tiles
+NPC_FILES = {"cathedral": "priest.png", "mosque": "muslim.png", "synagogue": "rabbi.png"}
+NPC_SCALE = (0.5, 1.15)
+NPC_DIALOGUES = {
+    "cathedral": [
+        "Bonjour ! Je suis chrétien.",
+        "Chaque matin, je viens prier.",
+        "J'aime chanter à la chorale.",
+        "Ensuite, l'après-midi, je vais au marché et je joue aux jeux vidéos"
+    ],
+    "mosque": [
+        "Salam ! Je suis musulman.",
+        "Je viens ici cinq fois par jour.",
+        "Après la prière, je partage le thé.",
+        "Ensuite, l'après-midi, je joue aux jeux vidéos et je vais à la piscine."
+    ],
+    "synagogue": [
+        "Shalom ! Je suis juif.",
+        "J'étudie la Torah ici chaque matin.",
+        "Le samedi, je célèbre le Shabbat.",
+        "Ensuite, l'après-midi, je vais à la piscine et je vais au marché."
+    ]
+}
+
+
+# --- Level ---
+class Level:
+    # The fork map and everything placed on it. Assets arrive through loader
+    # jobs (add_jobs), then build() places buildings and NPCs.
+    def __init__(self, view_size=VIEW_SIZE, map_path=MAP_PATH):
+        self.fork_map = load_map(map_path).ground
+        self.rows = len(self.fork_map)
+        self.cols = len(self.fork_map[0])
+        width, height = view_size
+        self.offset_x = (width - self.cols * TILE_SIZE) // 2
+        self.offset_y = (height - self.rows * TILE_SIZE) // 2
+
+        self.atlas = None
+        self.tiles = {}
+        self.tile_masks = {}
+        self.streamed_tiles = []  # Added since the walk map was last rebuilt
+        self.building_images = {}
+        self.npc_images = {}
+
+        # Player start: the lowest path tile
+        start_row, start_col = None, None
+        for r in range(self.rows - 1, -1, -1):
+            for c in range(self.cols):
+                if self.fork_map[r][c] == PATH_TILE:
+                    start_row, start_col = r, c
+                    break
+            if start_row is not None:
+                break
+        if start_row is None:
+            start_row, start_col = self.rows - 1, self.cols // 2
+        self.start = self.tile_center(start_row, start_col)
+
+    @property
+    def origin(self):
+        return self.offset_x, self.offset_y
+
+    def tile_center(self, row, col):
+        return (self.offset_x + col * TILE_SIZE + TILE_SIZE // 2, self.offset_y + row * TILE_SIZE + TILE_SIZE // 2)
+
+    def tiles_in(self, rect):
+        first_row = max(0, (rect.top - self.offset_y) // TILE_SIZE)
+        last_row = min(self.rows - 1, (rect.bottom - 1 - self.offset_y) // TILE_SIZE)
+        first_col = max(0, (rect.left - self.offset_x) // TILE_SIZE)
+        last_col = min(self.cols - 1, (rect.right - 1 - self.offset_x) // TILE_SIZE)
+        return {
+            int(self.fork_map[r][c]) for r in range(first_row, last_row + 1) for c in range(first_col, last_col + 1)
+        }
+
+    # --- Loading ---
+    def load_baked_atlas(self):
+        self.atlas = load_atlas(tile_size=TILE_SIZE)
+
+    def release_atlas(self):
+        # Every entry has been copied out in its own format by now, so the
+        # sheet they were cut from can go
+        self.atlas = None
+
+    def load_tile(self, tile_num):
+        atlas = self.atlas
+        if atlas and tile_num in atlas.tiles:
+            tile = atlas.tiles[tile_num]
+            self.tile_masks[tile_num] = atlas.tile_masks[tile_num]
+        else:
+            filename = f"tiles/tile{tile_num}.png"
+            if not os.path.exists(filename):
+                return
+            img = pygame.image.load(filename).convert_alpha()
+            tile = pygame.transform.scale(img, (TILE_SIZE, TILE_SIZE))
+            self.tile_masks[tile_num] = build_tile_mask(tile)
+        self.tiles[tile_num] = texture_budget.optimize(tile, "tiles", tile_num)
+        self.streamed_tiles.append(tile_num)
+
+    def load_sheet(self, sheet, scale):
+        animation_cache.get(sheet, FRAME_SIZE, scale, self.atlas)
+
+    def load_building(self, name):
+        path = f"{name}.png"
+        if self.atlas and name in self.atlas.images:
+            self.building_images[name] = texture_budget.optimize(self.atlas.images[name], "buildings", name)
+        elif os.path.exists(path):
+            img = pygame.image.load(path).convert_alpha()
+            scale_x, scale_y = BUILDING_SCALES[name]
+            img = pygame.transform.scale(img, (int(TILE_SIZE * scale_x), int(TILE_SIZE * scale_y)))
+            self.building_images[name] = texture_budget.optimize(img, "buildings", name)
+
+    def load_npc(self, name, filename):
+        if self.atlas and filename in self.atlas.images:
+            self.npc_images[name] = texture_budget.optimize(self.atlas.images[filename], "npcs", name)
+        elif os.path.exists(filename):
+            img = pygame.image.load(filename).convert_alpha()
+            img = pygame.transform.scale(img, (int(TILE_SIZE * NPC_SCALE[0]), int(TILE_SIZE * NPC_SCALE[1])))
+            self.npc_images[name] = texture_budget.optimize(img, "npcs", name)
+
+    def add_jobs(self, loader, first_view=None):
+        # Tiles around first_view (all of them without one) load with the first screen
+        loader.add("atlas", self.load_baked_atlas, FIRST_SCREEN)  # Every other job reads from it
+
+        # Grass fills every chunk, so it always comes first
+        used_tiles = {int(tile_num) for row in self.fork_map for tile_num in row} | {GRASS_TILE}
+        first_screen_tiles = self.tiles_in(first_view) | {GRASS_TILE} if first_view else used_tiles
+        for tile_num in sorted(used_tiles):
+            priority = FIRST_SCREEN if tile_num in first_screen_tiles else STREAMED
+            loader.add(f"tile{tile_num}", partial(self.load_tile, tile_num), priority)
+
+        for sheet in (IDLE_SHEET, RUN_SHEET):
+            loader.add(sheet, partial(self.load_sheet, sheet, PLAYER_SCALE), FIRST_SCREEN)
+            loader.add(f"{sheet} (crowd)", partial(self.load_sheet, sheet, CROWD_SCALE), STREAMED)
+        for name in BUILDING_NAMES:
+            loader.add(name, partial(self.load_building, name), FIRST_SCREEN)
+        for name, filename in NPC_FILES.items():
+            loader.add(filename, partial(self.load_npc, name, filename), FIRST_SCREEN)
+        loader.add("release atlas", self.release_atlas, STREAMED)  # Added last, so it runs after every job above
+
+    def load(self):
+        # Everything at once, for tools and headless runs
+        loader = AssetLoader()
+        self.add_jobs(loader)
+        while loader.pending():
+            loader.step(float("inf"))
+        self.build()
+        return self
+
+    def apply_streamed_tiles(self):
+        # Returns True when tiles arrived and the walk map was rebuilt
+        if not self.streamed_tiles:
+            return False
+        self.streamed_tiles.clear()
+        self.walk_map.invalidate()
+        self.flow_fields.invalidate()
+        return True
+
+    def new_character(self):
+        start_x, start_y = self.start
+        return Character(
+            IDLE_SHEET,
+            RUN_SHEET,
+            FRAME_SIZE,
+            (start_x - FRAME_SIZE[0] // 2, start_y - FRAME_SIZE[1] // 2),
+            scale=PLAYER_SCALE,
+            atlas=self.atlas
+        )
+
+    # --- Placement ---
+    def build(self):
+        # Needs the FIRST_SCREEN jobs done
+        fork_map = self.fork_map
+        self.walk_map = WalkMap(fork_map, self.tile_masks, TILE_SIZE, self.origin)
+        self.streamed_tiles.clear()
+
+        # --- Building placement ---
+        top_row = None
+        path_cols = []
+        for r in range(self.rows):
+            for c in range(self.cols):
+                if fork_map[r][c] == PATH_TILE:
+                    if top_row is None:
+                        top_row = r
+                    if r == top_row:
+                        path_cols.append(c)
+            if top_row is not None:
+                break
+
+        path_cols.sort()
+        self.buildings = []
+        self.building_colliders = []
+        self.building_doors = {}  # Flow-field destinations in front of each building
+
+        if len(path_cols) >= 3:
+            center_y = self.offset_y + top_row * TILE_SIZE + TILE_SIZE // 2
+            positions = [
+                (self.offset_x + path_cols[0] * TILE_SIZE + TILE_SIZE // 2, center_y),
+                (self.offset_x + path_cols[len(path_cols)//2] * TILE_SIZE + TILE_SIZE // 2, center_y),
+                (self.offset_x + path_cols[-1] * TILE_SIZE + TILE_SIZE // 2, center_y),
+            ]
+
+            for (name, pos) in zip(BUILDING_NAMES, positions):
+                if name in self.building_images:
+                    img = self.building_images[name]
+                    y_offset = TILE_SIZE * 1.5
+                    rect = img.get_rect(midbottom=(pos[0], pos[1] + y_offset))
+                    self.buildings.append((name, img, rect))
+                    self.building_doors[name] = rect.midbottom
+
+                    collider_height = rect.height // 4
+                    collider_rect = pygame.Rect(
+                        rect.centerx - rect.width // 4,
+                        rect.bottom - collider_height,
+                        rect.width // 2,
+                        collider_height
+                    )
+                    self.building_colliders.append((name, collider_rect))
+
+        # --- NPCs ---
+        self.npc_data = []
+        for (name, _, rect) in self.buildings:
+            if name in self.npc_images:
+                img = self.npc_images[name]
+                npc_x = rect.centerx - img.get_width() // 2
+                npc_y = rect.bottom - int(TILE_SIZE * 0.15)
+                npc_rect = pygame.Rect(npc_x, npc_y, img.get_width(), img.get_height())
+
+                dialogue_hitbox = pygame.Rect(
+                    npc_rect.centerx - TILE_SIZE,
+                    npc_rect.bottom - TILE_SIZE // 2,
+                    TILE_SIZE * 2,
+                    TILE_SIZE
+                )
+                self.npc_data.append((name, img, npc_rect, dialogue_hitbox))
+
+        self.npc_index = SpatialHash(TILE_SIZE)
+        for npc in self.npc_data:
+            self.npc_index.insert(npc[3], npc)
+
+        self.building_index = SpatialHash(TILE_SIZE)
+        for name, collider in self.building_colliders:
+            self.building_index.insert(collider, name)
+
+        # Buildings and NPCs both block walkers; the player only bumps into buildings
+        self.obstacles = [collider for _, collider in self.building_colliders]
+        self.obstacles += [npc_rect for _, _, npc_rect, _ in self.npc_data]
+        self.flow_fields = FlowFields(
+            self.walk_map,
+            self.new_character().rect.size,
+            self.obstacles,
+            cell_size=TILE_SIZE // 4
+        )
+
+    def can_stand(self, rect):
+        return self.walk_map.can_move(rect) and not self.building_index.collides(rect)
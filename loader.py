@@ -0,0 +1,46 @@
+import asyncio
+import heapq
+import time
+
+FIRST_SCREEN = 0  # Needed before the first game frame
+STREAMED = 1      # Loaded between frames once the game is running
+
+
+# --- Progressive Asset Loader ---
+class AssetLoader:
+    # Load jobs are plain callables, run lowest priority first (then in the
+    # order they were added) in short time slices so frames keep coming
+    def __init__(self):
+        self.queue = []
+        self.added = 0
+        self.done = 0
+        self.current = None
+
+    def add(self, name, load, priority=STREAMED):
+        heapq.heappush(self.queue, (priority, self.added, name, load))
+        self.added += 1
+
+    @property
+    def progress(self):
+        return self.done / self.added if self.added else 1.0
+
+    def pending(self, max_priority=None):
+        return bool(self.queue) and (max_priority is None or self.queue[0][0] <= max_priority)
+
+    def step(self, budget_ms, max_priority=None):
+        # Runs at least one job, then more until the budget is spent
+        deadline = time.perf_counter() + budget_ms / 1000
+        while self.pending(max_priority):
+            _, _, self.current, load = heapq.heappop(self.queue)
+            load()
+            self.done += 1
+            if time.perf_counter() >= deadline:
+                break
+
+    async def run(self, budget_ms, max_priority=None, on_progress=None):
+        # Yields to the event loop after every slice so the browser tab stays responsive
+        while self.pending(max_priority):
+            self.step(budget_ms, max_priority)
+            if on_progress:
+                on_progress(self)
+            await asyncio.sleep(0)
@@ -0,0 +1,140 @@
+"""Compact binary tile maps.
+
+Layout (little-endian): a 16-byte header (magic, version, layer count,
+width, height), one 16-byte ASCII name per layer, then each layer as a
+row-major uint16 grid. Maps are memory-mapped and exposed as NumPy views,
+so opening one costs nothing beyond the header, and a layer takes
+width * height * 2 bytes.
+
+    python mapfile.py maps/fork.txt maps/fork.map
+
+converts a text map written in the fork macro language into this format.
+"""
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+MAGIC = b"PFMP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+LAYER_NAME_SIZE = 16
+DTYPE = np.dtype("<u2")
+GRASS_TILE = 58
+
+# Each macro expands to three tiles in a row
+MACROS = {
+    "PATH": [12, 14, 10],
+    "LEFT_PATH": [3, 14, 1],
+    "TWENRIGHT": [12, 14, 19],
+    "TWENONELEFT": [21, 14, 19],
+    "TWENONELEFTTWO": [21, 14, 10],
+    "DOWNPATH": [23, 2, 22],
+}
+
+
+# --- Macro Language ---
+def parse_macro_map(text):
+    base = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        cells = [cell.strip() for cell in line.split(",") if cell.strip()]
+        base.append([int(cell) if cell.isdigit() else cell for cell in cells])
+    return base
+
+
+def expand_macros(base, pad_tile=GRASS_TILE):
+    tile_map = []
+    for row in base:
+        expanded = []
+        for cell in row:
+            if isinstance(cell, int):
+                expanded.append(cell)
+            elif cell in MACROS:
+                expanded.extend(MACROS[cell])
+            else:
+                raise ValueError(f"Unknown map macro {cell!r}")
+        tile_map.append(expanded)
+
+    max_cols = max(len(row) for row in tile_map)
+    for row in tile_map:
+        row.extend([pad_tile] * (max_cols - len(row)))
+    return tile_map
+
+
+# --- Binary Format ---
+class TileMap:
+    def __init__(self, layers):
+        self.layers = layers
+        self.ground = next(iter(layers.values()))
+        self.height, self.width = self.ground.shape
+
+    @property
+    def nbytes(self):
+        return sum(layer.nbytes for layer in self.layers.values())
+
+
+def save_map(path, layers):
+    arrays = {name: np.asarray(grid, dtype=DTYPE) for name, grid in layers.items()}
+    shapes = {array.shape for array in arrays.values()}
+    if len(shapes) != 1 or len(next(iter(shapes))) != 2:
+        raise ValueError("All map layers must be 2D grids of the same size")
+    height, width = shapes.pop()
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(arrays), width, height))
+        for name in arrays:
+            encoded = name.encode("ascii")
+            if len(encoded) > LAYER_NAME_SIZE:
+                raise ValueError(f"Layer name {name!r} is longer than {LAYER_NAME_SIZE} bytes")
+            f.write(encoded.ljust(LAYER_NAME_SIZE, b"\0"))
+        for array in arrays.values():
+            f.write(array.tobytes())
+
+
+def load_map(path):
+    with open(path, "rb") as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # No mmap support (e.g. the browser build): read once instead
+            buffer = f.read()
+
+    magic, version, layer_count, width, height = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} map file")
+
+    layers = {}
+    names_offset = HEADER.size
+    data_offset = names_offset + layer_count * LAYER_NAME_SIZE
+    for i in range(layer_count):
+        start = names_offset + i * LAYER_NAME_SIZE
+        name = bytes(buffer[start:start + LAYER_NAME_SIZE]).rstrip(b"\0").decode("ascii")
+        offset = data_offset + i * width * height * DTYPE.itemsize
+        layers[name] = np.frombuffer(buffer, dtype=DTYPE, count=width * height, offset=offset).reshape(height, width)
+    return TileMap(layers)
+
+
+def convert(source, output):
+    with open(source, encoding="utf-8") as f:
+        tile_map = expand_macros(parse_macro_map(f.read()))
+    save_map(output, {"ground": tile_map})
+    return tile_map
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("usage: python mapfile.py SOURCE.txt OUTPUT.map", file=sys.stderr)
+        return 2
+    tile_map = convert(*argv)
+    print(f"Wrote {argv[1]} ({len(tile_map[0])}x{len(tile_map)} tiles, {os.path.getsize(argv[1])} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+IDLE_FPS = 20  # Fine enough for the 200 ms idle animation
+IDLE_AFTER_MS = 100
+
+
+# --- Adaptive Frame Pacing ---
+class FramePacer:
+    # Skips drawing frames that would look exactly like the last one and, once
+    # the scene has been still for a while, drops the loop to a low tick rate.
+    # Input, or changes on two frames in a row (something is moving), bring
+    # back the full rate. A lone change such as an idle animation frame is
+    # drawn without leaving the low rate.
+    def __init__(self, fps, idle_fps=IDLE_FPS, idle_after_ms=IDLE_AFTER_MS, enabled=True):
+        self.fps = fps
+        self.idle_fps = idle_fps
+        self.idle_after_ms = idle_after_ms
+        self.enabled = enabled
+        self.scene = None
+        self.still_ms = 0.0
+        self.changed_last = True
+        self.idle = False
+        self.rendered = 0
+        self.skipped = 0
+        self.idle_frames = 0
+
+    @property
+    def tick_rate(self):
+        # An uncapped loop (fps 0, benchmarks and scripted runs) stays uncapped
+        if self.idle and self.fps:
+            return min(self.fps, self.idle_fps)
+        return self.fps
+
+    def update(self, dt, scene, wake=False):
+        # scene is anything comparable that captures what the frame would show,
+        # wake is set by input. Returns whether the frame needs drawing
+        changed = not self.enabled or wake or scene != self.scene
+        self.scene = scene
+        if self.idle:
+            self.idle_frames += 1
+
+        if changed:
+            if wake or self.changed_last:
+                self.idle = False
+            self.still_ms = 0.0
+            self.rendered += 1
+        else:
+            self.still_ms += dt
+            if self.still_ms >= self.idle_after_ms:
+                self.idle = True
+            self.skipped += 1
+        self.changed_last = changed
+        return changed
+
+    def stats(self):
+        return {"rendered": self.rendered, "skipped": self.skipped, "idle": self.idle_frames}
@@ -0,0 +1,131 @@
+import sys
+import time
+from collections import deque
+
+import pygame
+
+PHASES = ("events", "loading", "movement", "npc_scan", "tilemap", "entities", "ui", "overlay", "present")
+PHASE_COLORS = {
+    "events": (120, 120, 255),
+    "loading": (255, 255, 255),
+    "movement": (255, 80, 80),
+    "npc_scan": (255, 170, 60),
+    "tilemap": (80, 200, 80),
+    "entities": (60, 200, 200),
+    "ui": (220, 120, 220),
+    "overlay": (140, 140, 140),
+    "present": (240, 240, 90),
+}
+GRAPH_SIZE = (240, 100)
+PIXELS_PER_MS = 5
+FRAME_BUDGET_MS = 1000 / 60
+LEGEND_REFRESH = 30  # frames
+
+
+# --- Per-Phase Frame Profiler ---
+class FrameProfiler:
+    def __init__(self, history=600):
+        self.enabled = False
+        self.samples = deque(maxlen=history)
+        self.current = {}
+        self.last = 0.0
+        self.font = None
+        self.graph = None
+        self.legend = None
+        self.frames_since_legend = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.graph = None
+        self.legend = None
+        self.current = {}
+        self.last = time.perf_counter()
+
+    def begin_frame(self):
+        if self.enabled:
+            self.current = {}
+            self.last = time.perf_counter()
+
+    def mark(self, phase):
+        if self.enabled:
+            now = time.perf_counter()
+            self.current[phase] = self.current.get(phase, 0.0) + now - self.last
+            self.last = now
+
+    def end_frame(self):
+        if self.enabled:
+            sample = tuple(self.current.get(phase, 0.0) * 1000 for phase in PHASES)
+            self.samples.append(sample)
+            self.add_column(sample)
+
+    def averages(self, count=60):
+        recent = list(self.samples)[-count:]
+        if not recent:
+            return [0.0] * len(PHASES)
+        return [sum(column) / len(recent) for column in zip(*recent)]
+
+    # --- Overlay ---
+    def add_column(self, sample):
+        width, height = GRAPH_SIZE
+        if self.graph is None:
+            self.graph = pygame.Surface(GRAPH_SIZE).convert()
+            self.graph.fill((0, 0, 0))
+        self.graph.scroll(-1, 0)
+        pygame.draw.line(self.graph, (0, 0, 0), (width - 1, 0), (width - 1, height - 1))
+
+        y = height
+        for phase, ms in zip(PHASES, sample):
+            bar = int(ms * PIXELS_PER_MS)
+            if bar <= 0:
+                continue
+            pygame.draw.line(self.graph, PHASE_COLORS[phase], (width - 1, y - 1), (width - 1, max(0, y - bar)))
+            y -= bar
+            if y <= 0:
+                break
+
+    def render_legend(self):
+        if self.font is None:
+            self.font = pygame.font.SysFont(None, 18)
+        line_height = self.font.get_linesize()
+        lines = [(f"{phase:<9} {ms:6.2f} ms", PHASE_COLORS[phase]) for phase, ms in zip(PHASES, self.averages())]
+        lines.append((f"{'total':<9} {sum(self.averages()):6.2f} ms", (255, 255, 255)))
+        legend = pygame.Surface((GRAPH_SIZE[0], line_height * len(lines))).convert()
+        legend.fill((0, 0, 0))
+        for i, (text, color) in enumerate(lines):
+            legend.blit(self.font.render(text, True, color), (4, i * line_height))
+        self.legend = legend
+
+    def draw(self, surface, pos=(10, 10)):
+        if not self.enabled or self.graph is None:
+            return None
+        self.frames_since_legend += 1
+        if self.legend is None or self.frames_since_legend >= LEGEND_REFRESH:
+            self.render_legend()
+            self.frames_since_legend = 0
+
+        x, y = pos
+        graph_rect = surface.blit(self.graph, (x, y))
+        budget_y = y + GRAPH_SIZE[1] - int(FRAME_BUDGET_MS * PIXELS_PER_MS)
+        pygame.draw.line(surface, (255, 255, 255), (x, budget_y), (x + GRAPH_SIZE[0] - 1, budget_y))
+        legend_rect = surface.blit(self.legend, (x, graph_rect.bottom))
+        return graph_rect.union(legend_rect)
+
+    # --- Export ---
+    def to_csv_lines(self):
+        yield "frame," + ",".join(PHASES) + ",total"
+        for i, sample in enumerate(self.samples):
+            yield f"{i}," + ",".join(f"{ms:.4f}" for ms in sample) + f",{sum(sample):.4f}"
+
+    def dump(self, path=None):
+        if sys.platform == "emscripten":
+            # pygbag forwards stdout to the browser console
+            for line in self.to_csv_lines():
+                print(line)
+            return None
+        if path is None:
+            path = time.strftime("profile_%Y%m%d_%H%M%S.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            for line in self.to_csv_lines():
+                f.write(line + "\n")
+        print(f"Wrote {len(self.samples)} frame samples to {path}")
+        return path
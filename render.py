@@ -0,0 +1,375 @@
+import math
+from operator import itemgetter
+
+import pygame
+
+from cache import ByteBudgetCache, LRUCache
+
+GRASS_TILE = 58
+SCALED_CACHE_BYTES = 128 * 1024 * 1024  # Scaled sprites and chunks kept for zoom levels other than 1
+
+
+def surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+# --- Zoom Levels ---
+class ScaledSurfaceCache:
+    # Copies of surfaces scaled to each zoom level, keyed by (asset, zoom) and
+    # evicted least recently used first once max_bytes is spent. Zoom 1 hands
+    # back the original. Sprites are trimmed to their visible pixels, which is
+    # most of the saving: character frames are over 90% transparent padding.
+    def __init__(self, max_bytes=SCALED_CACHE_BYTES):
+        self.cache = ByteBudgetCache(max_bytes, lambda entry: surface_bytes(entry[0]))
+        self.created = 0
+
+    def scale(self, surface, zoom, key, trim):
+        # Entries are (scaled surface, offset of its top-left within the full scaled size)
+        entry = self.cache.get((key, zoom))
+        if entry is None:
+            width, height = surface.get_size()
+            scaled = pygame.transform.scale(surface, (max(1, round(width * zoom)), max(1, round(height * zoom))))
+            bounds = scaled.get_bounding_rect() if trim else scaled.get_rect()
+            if bounds.size != scaled.get_size() and bounds.width and bounds.height:
+                scaled = scaled.subsurface(bounds).copy()
+            entry = (scaled, bounds.topleft)
+            self.cache.put((key, zoom), entry)
+            self.created += 1
+        return entry
+
+    def cached(self, key, zoom):
+        entry = self.cache.get((key, zoom))
+        return entry[0] if entry else None
+
+    def get(self, surface, zoom, key=None):
+        # Untrimmed, for opaque surfaces such as tilemap chunks
+        if zoom == 1:
+            return surface
+        return self.scale(surface, zoom, surface if key is None else key, False)[0]
+
+    def sprite(self, surface, zoom, pos):
+        # The surface to draw for a sprite at screen position pos, and where to draw it
+        if zoom == 1:
+            return surface, pos
+        scaled, (dx, dy) = self.scale(surface, zoom, surface, True)
+        return scaled, (pos[0] + dx, pos[1] + dy)
+
+    def warm(self, surfaces, zoom):
+        # Scale a whole set up front, so sprites seen for the first time cause no hitch
+        for surface in surfaces:
+            self.sprite(surface, zoom, (0, 0))
+
+
+scaled_surfaces = ScaledSurfaceCache()
+
+
+# --- Chunked Tilemap ---
+class ChunkedTilemap:
+    # Pre-rendered square chunks of chunk_tiles x chunk_tiles tiles, built on
+    # first sight and evicted least-recently-drawn first. Chunks outside the
+    # map are plain grass and share a single surface.
+    def __init__(self, tile_map, tiles, tile_size, origin=(0, 0), chunk_tiles=4, max_chunks=24):
+        self.tile_map = tile_map
+        self.tiles = tiles
+        self.tile_size = tile_size
+        self.origin_x, self.origin_y = origin
+        self.chunk_tiles = chunk_tiles
+        self.chunk_size = chunk_tiles * tile_size
+        self.chunks = LRUCache(max_chunks)
+        self.grass_chunk = None
+        self.builds = 0
+        self.version = 0  # Part of the key for zoomed chunks
+        self.rows = len(tile_map)
+        self.cols = len(tile_map[0]) if len(tile_map) else 0
+
+    @property
+    def bounds(self):
+        return pygame.Rect(self.origin_x, self.origin_y, self.cols * self.tile_size, self.rows * self.tile_size)
+
+    def invalidate(self):
+        # Call after editing the tile map in place or adding tiles
+        self.chunks.clear()
+        self.grass_chunk = None
+        self.version += 1
+        self.rows = len(self.tile_map)
+        self.cols = len(self.tile_map[0]) if len(self.tile_map) else 0
+
+    def render_chunk(self, chunk_x, chunk_y):
+        surface = pygame.Surface((self.chunk_size, self.chunk_size)).convert()
+        surface.fill((0, 0, 0))
+        grass_tile = self.tiles.get(GRASS_TILE)
+        for row in range(self.chunk_tiles):
+            map_row = chunk_y * self.chunk_tiles + row
+            for col in range(self.chunk_tiles):
+                map_col = chunk_x * self.chunk_tiles + col
+                pos = (col * self.tile_size, row * self.tile_size)
+                if grass_tile:
+                    surface.blit(grass_tile, pos)
+                if 0 <= map_row < self.rows and 0 <= map_col < self.cols:
+                    tile_num = self.tile_map[map_row][map_col]
+                    if tile_num != GRASS_TILE and tile_num in self.tiles:
+                        surface.blit(self.tiles[tile_num], pos)
+        self.builds += 1
+        return surface
+
+    def bytes_held(self):
+        chunks = list(self.chunks.items.values()) + ([self.grass_chunk] if self.grass_chunk else [])
+        return sum(surface_bytes(chunk) for chunk in chunks)
+
+    def in_map(self, chunk_x, chunk_y):
+        span = self.chunk_tiles
+        return 0 <= chunk_x and 0 <= chunk_y and chunk_x * span < self.cols and chunk_y * span < self.rows
+
+    def chunk(self, chunk_x, chunk_y):
+        if not self.in_map(chunk_x, chunk_y):
+            if self.grass_chunk is None:
+                self.grass_chunk = self.render_chunk(-1, -1)
+            return self.grass_chunk
+
+        key = (chunk_x, chunk_y)
+        surface = self.chunks.get(key)
+        if surface is None:
+            surface = self.render_chunk(chunk_x, chunk_y)
+            self.chunks.put(key, surface)
+        return surface
+
+    def scaled_chunk(self, chunk_x, chunk_y, zoom):
+        # Every grass chunk outside the map shares one key
+        key = (self, self.version) + ((chunk_x, chunk_y) if self.in_map(chunk_x, chunk_y) else ())
+        scaled = scaled_surfaces.cached(key, zoom)
+        if scaled is None:
+            scaled = scaled_surfaces.get(self.chunk(chunk_x, chunk_y), zoom, key)
+        return scaled
+
+    def draw(self, surface, camera_x, camera_y, zoom=1):
+        width, height = surface.get_size()
+        size = self.chunk_size
+        view_width, view_height = math.ceil(width / zoom), math.ceil(height / zoom)
+        first_x = (camera_x - self.origin_x) // size
+        first_y = (camera_y - self.origin_y) // size
+        last_x = (camera_x + view_width - 1 - self.origin_x) // size
+        last_y = (camera_y + view_height - 1 - self.origin_y) // size
+
+        # Never evict a chunk that is still on screen
+        visible = (last_x - first_x + 1) * (last_y - first_y + 1)
+        if zoom == 1:
+            self.chunks.max_items = max(self.chunks.max_items, visible)
+
+        # Chunk positions step by the scaled size from one rounded origin, so no seams
+        scaled_size = round(size * zoom)
+        base_x = round((self.origin_x - camera_x) * zoom)
+        base_y = round((self.origin_y - camera_y) * zoom)
+        blits = []
+        for chunk_y in range(first_y, last_y + 1):
+            for chunk_x in range(first_x, last_x + 1):
+                pos = (base_x + chunk_x * scaled_size, base_y + chunk_y * scaled_size)
+                if zoom == 1:
+                    blits.append((self.chunk(chunk_x, chunk_y), pos))
+                else:
+                    blits.append((self.scaled_chunk(chunk_x, chunk_y, zoom), pos))
+        surface.blits(blits, doreturn=False)
+
+
+# --- Scrolling ---
+def scroll_shift(old, new):
+    # How far to scroll() a view drawn for the key old, so that it shows the
+    # key new, or None when it must be drawn again. Keys are (size,
+    # camera_x, camera_y, zoom, version), and only the camera may differ.
+    if old is None or old[0] != new[0] or old[3:] != new[3:]:
+        return None
+    (width, height), zoom = new[0], new[3]
+    shift_x, shift_y = (old[1] - new[1]) * zoom, (old[2] - new[2]) * zoom
+    # Zoomed positions are rounded halves to even, so only even shifts move them all alike
+    step = 1 if zoom == 1 else 2
+    if shift_x % step or shift_y % step or abs(shift_x) >= width or abs(shift_y) >= height:
+        return None
+    return int(shift_x), int(shift_y)
+
+
+def exposed(size, shift):
+    # The strips of a surface that scroll(*shift) leaves stale
+    width, height = size
+    shift_x, shift_y = shift
+    strips = []
+    if shift_x:
+        strips.append(pygame.Rect(0 if shift_x > 0 else width + shift_x, 0, abs(shift_x), height))
+    if shift_y:
+        strips.append(pygame.Rect(0, 0 if shift_y > 0 else height + shift_y, width, abs(shift_y)))
+    return strips
+
+
+# --- Static Background Cache ---
+class BackgroundLayer:
+    # Keeps one composed copy of the current view for partial restores
+    def __init__(self, tilemap):
+        self.tilemap = tilemap
+        self.surface = None
+        self.key = None
+        self.version = 0
+        self.rebuilds = 0
+        self.scrolls = 0
+
+    def invalidate(self):
+        self.tilemap.invalidate()
+        self.key = None
+        self.version += 1
+
+    def get(self, size, camera_x, camera_y, zoom=1):
+        key = (size, camera_x, camera_y, zoom, self.version)
+        if key == self.key:
+            return self.surface
+        shift = scroll_shift(self.key, key)
+        if shift:
+            # Only the camera moved: keep what is still in view, draw the rest
+            self.surface.scroll(*shift)
+            for strip in exposed(size, shift):
+                self.surface.set_clip(strip)
+                self.tilemap.draw(self.surface, camera_x, camera_y, zoom)
+            self.surface.set_clip(None)
+            self.scrolls += 1
+        else:
+            if self.surface is None or self.surface.get_size() != size:
+                self.surface = pygame.Surface(size).convert()
+            self.tilemap.draw(self.surface, camera_x, camera_y, zoom)
+            self.rebuilds += 1
+        self.key = key
+        return self.surface
+
+    def draw(self, surface, camera_x, camera_y, zoom=1):
+        self.tilemap.draw(surface, camera_x, camera_y, zoom)
+
+
+# --- Render Queue ---
+WORLD = 0  # Sorted by depth, the world y of each sprite's feet
+UI = 1     # Drawn over the world in the order added
+
+
+def submit(surface, blits):
+    # One call for a whole layer; fblits (pygame-ce) skips building the rect list
+    if hasattr(surface, "fblits"):
+        surface.fblits(blits)
+    else:
+        surface.blits(blits, doreturn=False)
+
+
+class RenderQueue:
+    # One frame's sprites in screen coordinates. World sprites with deeper
+    # feet are drawn over those behind them, so the player can walk behind a
+    # building. The depth is given in world pixels rather than taken from the
+    # screen rect, which zoom scales and trimming cuts short. Static sprites
+    # (buildings, NPCs) never move on their own, which lets the dirty
+    # renderer skip them when they are left untouched.
+    def __init__(self):
+        self.world = []
+        self.ui = []
+
+    def add(self, image, pos, layer=WORLD, static=False, depth=None):
+        # depth is required for WORLD sprites, UI ones go in the order added
+        rect = image.get_rect(topleft=pos)
+        if layer == UI:
+            self.ui.append((image, rect))
+        elif depth is None:
+            raise ValueError("World sprites need a depth, the world y of their feet")
+        else:
+            self.world.append((depth, image, rect, static))
+
+    def add_blits(self, sprites, static=False):
+        # (image, pos, depth) triples, such as Crowd.sprites()
+        world = self.world
+        for image, pos, depth in sprites:
+            world.append((depth, image, image.get_rect(topleft=pos), static))
+
+    def sorted_world(self, view):
+        # Visible world sprites back to front, and the rects of the moving ones
+        visible = [entry for entry in self.world if view.colliderect(entry[2])]
+        visible.sort(key=itemgetter(0))  # Stable: ties keep the order added
+        sprites = [(image, rect) for _, image, rect, _ in visible]
+        dynamic = [rect for _, _, rect, static in visible if not static]
+        return sprites, dynamic
+
+    def clear(self):
+        self.world.clear()
+        self.ui.clear()
+
+
+# --- Dirty Rectangle Presenter ---
+class DirtyRenderer:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.previous = []
+        self.current = []
+        self.key = None
+        self.full_redraw = True
+        self.scrolled = False
+        self.exposed = []
+        self.view = None
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def restore(self, surface, background, camera):
+        key = (surface.get_size(), camera.x, camera.y, camera.zoom, background.version)
+        self.exposed = []
+        if key != self.key:
+            shift = scroll_shift(self.key, key) if self.enabled and not self.full_redraw else None
+            if shift:
+                # Slide last frame along with the camera. What it uncovered,
+                # and wherever last frame's rects slid to, are rebuilt in draw_world.
+                surface.scroll(*shift)
+                self.previous = [rect.move(shift) for rect in self.previous]
+                self.exposed = exposed(key[0], shift)
+                self.scrolled = True
+            else:
+                self.full_redraw = True
+            self.key = key
+
+        if not self.enabled or self.full_redraw:
+            background.draw(surface, camera.x, camera.y, camera.zoom)
+        else:
+            self.view = background.get(surface.get_size(), camera.x, camera.y, camera.zoom)
+
+    def draw_world(self, surface, queue):
+        sprites, dynamic = queue.sorted_world(surface.get_rect())
+        if not self.enabled or self.full_redraw:
+            submit(surface, sprites)
+        else:
+            # Rebuild last frame's regions and this frame's moving sprites from
+            # the background up, clipped, so overlaps sort exactly as in a full redraw.
+            # That is a blit per region and per sprite over it, against one plus
+            # one per sprite for drawing the whole world again, as a crowd needs.
+            view = self.view
+            damaged = self.previous + self.exposed + dynamic
+            limit = len(sprites) + 1
+            rects = [rect for _, rect in sprites]
+            hits = [rect.collidelistall(rects) for rect in damaged] if len(damaged) <= limit else None
+            if hits is None or len(damaged) + sum(map(len, hits)) > limit:
+                surface.blit(view, (0, 0))
+                submit(surface, sprites)
+            else:
+                for rect, indices in zip(damaged, hits):
+                    surface.set_clip(rect)
+                    surface.blit(view, rect, rect)
+                    for index in indices:
+                        surface.blit(*sprites[index])
+                surface.set_clip(None)
+        for rect in dynamic:
+            self.add(rect)
+
+    def draw_ui(self, surface, queue):
+        submit(surface, queue.ui)
+        for _, rect in queue.ui:
+            self.add(rect)
+
+    def add(self, rect):
+        if self.enabled and rect:
+            self.current.append(pygame.Rect(rect))
+
+    def present(self, display):
+        if not self.enabled or self.full_redraw or self.scrolled:
+            display.present()
+            self.full_redraw = False
+            self.scrolled = False
+        else:
+            display.present(self.previous + self.current)
+        self.previous = self.current
+        self.current = []
@@ -0,0 +1,202 @@
+"""Record play sessions as compact input logs and replay them headless.
+
+    python replay.py record session.log          # play, then save the log
+    python replay.py record --route route.log    # record the benchmark route
+    python replay.py play session.log [--repeat 1000]
+
+A log holds every simulation input in order: runs of ticks with the held
+movement keys, key presses and clicks (in world coordinates), then the
+final state of the session. Playing it back drives the simulation alone,
+with no rendering and no frame pacing, and checks that it ends in the same
+state: the player's rect, who was talked to and whether the journal is
+open. The level is loaded once and shared by every run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+
+from controls import HeldKeys
+
+MAGIC = "PFRP"
+VERSION = 1
+# One bit each, in this order; WASD counts as the matching arrow
+MOVE_KEYS = (
+    (pygame.K_LEFT, pygame.K_a),
+    (pygame.K_RIGHT, pygame.K_d),
+    (pygame.K_UP, pygame.K_w),
+    (pygame.K_DOWN, pygame.K_s),
+)
+
+
+def key_mask(keys):
+    return sum(1 << bit for bit, (arrow, letter) in enumerate(MOVE_KEYS) if keys[arrow] or keys[letter])
+
+
+def mask_keys(mask):
+    return HeldKeys(arrow for bit, (arrow, _) in enumerate(MOVE_KEYS) if mask & (1 << bit))
+
+
+# --- Input Log ---
+class InputLog:
+    # Entries: ("t", count, mask) for a run of ticks, ("p", key) and ("c", x, y)
+    def __init__(self, view_size=None, entries=None, final_state=None):
+        from level import VIEW_SIZE
+
+        self.view_size = tuple(view_size or VIEW_SIZE)
+        self.entries = entries if entries is not None else []
+        self.final_state = final_state
+
+    def press(self, key):
+        self.entries.append(("p", key))
+
+    def click(self, pos):
+        self.entries.append(("c", int(pos[0]), int(pos[1])))
+
+    def tick(self, keys):
+        mask = key_mask(keys)
+        last = self.entries[-1] if self.entries else None
+        if last and last[0] == "t" and last[2] == mask:
+            self.entries[-1] = ("t", last[1] + 1, mask)
+        else:
+            self.entries.append(("t", 1, mask))
+
+    @property
+    def ticks(self):
+        return sum(entry[1] for entry in self.entries if entry[0] == "t")
+
+    def dumps(self):
+        lines = [f"{MAGIC} {VERSION} {self.view_size[0]} {self.view_size[1]}"]
+        lines += [" ".join(str(part) for part in entry) for entry in self.entries]
+        if self.final_state is not None:
+            lines.append("= " + json.dumps(self.final_state, sort_keys=True))
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def loads(cls, text):
+        lines = text.splitlines()
+        magic, version, width, height = lines[0].split()
+        if magic != MAGIC or int(version) != VERSION:
+            raise ValueError(f"Not a version {VERSION} input log")
+
+        entries = []
+        final_state = None
+        for line in lines[1:]:
+            kind, _, rest = line.partition(" ")
+            if kind == "=":
+                final_state = json.loads(rest)
+            elif kind in ("t", "p", "c"):
+                entries.append((kind, *(int(part) for part in rest.split())))
+            elif line.strip():
+                raise ValueError(f"Unknown input log entry {line!r}")
+        return cls((int(width), int(height)), entries, final_state)
+
+    def save(self, path, final_state=None):
+        if final_state is not None:
+            self.final_state = {key: final_state[key] for key in ("rect", "talked_to", "show_journal")}
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.dumps())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.loads(f.read())
+
+
+# --- Headless Replay ---
+def replay(log, level):
+    from simulation import Simulation
+
+    simulation = Simulation(level)
+    for entry in log.entries:
+        if entry[0] == "t":
+            keys = mask_keys(entry[2])
+            for _ in range(entry[1]):
+                simulation.tick(keys)
+        elif entry[0] == "p":
+            simulation.press(entry[1])
+        else:
+            simulation.click(entry[1:])
+    return simulation.state()
+
+
+def headless():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")  # Leave Ctrl+C and SIGTERM to Python
+
+
+def load_level(view_size):
+    from level import Level
+
+    if pygame.display.get_surface() is None:
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))  # Images need a display to convert against
+    return Level(view_size).load()
+
+
+def record(path, script=None):
+    from controls import ScriptedInput
+    from main import main
+
+    log = InputLog()
+    controls = ScriptedInput(script) if script else None
+    state = asyncio.run(main(controls=controls, fps=0 if script else 60, lockstep=bool(script), log=log))
+    log.save(path, state)
+    print(f"Recorded {log.ticks} ticks in {len(log.entries)} entries to {path}")
+    return log
+
+
+def play(paths, repeat=1):
+    levels = {}
+    failures = 0
+    for path in paths:
+        log = InputLog.load(path)
+        level = levels.get(log.view_size)
+        if level is None:
+            level = levels[log.view_size] = load_level(log.view_size)
+
+        start = time.perf_counter()
+        for run in range(repeat):
+            state = replay(log, level)
+            if log.final_state is not None and state != log.final_state:
+                print(f"FAIL {path} (run {run + 1}): expected {log.final_state}, got {state}")
+                failures += 1
+                break
+        else:
+            elapsed = time.perf_counter() - start
+            print(f"ok   {path}: {repeat} run(s) of {log.ticks} ticks, {elapsed / repeat * 1000:.2f} ms each")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record and replay input logs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="play a session and save its input log")
+    record_parser.add_argument("log")
+    record_parser.add_argument("--route", action="store_true", help="play the benchmark route instead of the keyboard")
+    play_parser = commands.add_parser("play", help="replay logs headless and check their final state")
+    play_parser.add_argument("logs", nargs="+")
+    play_parser.add_argument("--repeat", type=int, default=1, help="runs per log (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        if args.route:
+            from benchmark import ROUTE
+
+            headless()
+            record(args.log, ROUTE)
+        else:
+            record(args.log)
+        return 0
+    headless()
+    return 1 if play(args.logs, args.repeat) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
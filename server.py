@@ -0,0 +1,278 @@
+"""Headless game server: many players' simulations on one asyncio loop.
+
+    python server.py serve [--host 127.0.0.1] [--port 8765]
+    python server.py load --clients 100,200,400 [--seconds 5]   # in another terminal
+
+Each TCP connection gets its own Simulation on a shared, fully loaded level.
+All sessions tick together at 60 Hz. The server is authoritative: clients
+only send input, one line per message, in the same encoding as input logs
+(replay.py):
+
+    t MASK     movement keys now held (bitmask: left, right, up, down)
+    p KEY      key press (pygame key code, 32 is SPACE)
+    c X Y      click to walk, in world coordinates
+
+After every tick the server sends each client one JSON line holding the
+tick number "t" and only the fields that changed since the last line it
+sent: "x", "y" (hitbox top-left), "dir", "run", "dialogue", "line",
+"talked" and "journal". The first line carries the full state. A client
+that falls behind on reading gets no lines until its buffer drains; the
+next line then carries every change since the last one it got.
+
+The load generator ramps up connected bots and reports, for each step,
+how many ticks per second the sessions really received. A step is
+sustained when that stays at 60. Run it in a separate process so the
+server keeps its core to itself.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import deque
+
+import pygame
+
+from level import VIEW_SIZE
+from replay import MOVE_KEYS, headless, load_level, mask_keys
+from simulation import Simulation
+
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_TICKS_PER_LOOP = 5  # Catch-up limit when the server falls behind, like the game loop
+MAX_BUFFERED = 64 * 1024  # Bytes queued for a client before its updates are held back
+ALL_KEYS = [mask_keys(mask) for mask in range(1 << len(MOVE_KEYS))]
+
+
+# --- Sessions ---
+class Session:
+    def __init__(self, level, writer):
+        self.simulation = Simulation(level)
+        self.writer = writer
+        self.mask = 0
+        self.inputs = []  # Presses and clicks since the last tick, in order
+        self.sent = None  # Last state sent, None until the first full one
+
+    def receive(self, line):
+        kind, _, rest = line.partition(" ")
+        try:
+            args = [int(part) for part in rest.split()]
+            if kind == "t":
+                self.mask = args[0] % len(ALL_KEYS)
+            elif kind == "p":
+                self.inputs.append(("p", args[0]))
+            elif kind == "c":
+                self.inputs.append(("c", args[0], args[1]))
+        except (ValueError, IndexError):
+            pass  # Malformed lines are dropped; the client gets no reply either way
+
+    def step(self):
+        simulation = self.simulation
+        for entry in self.inputs:
+            if entry[0] == "p":
+                simulation.press(entry[1])
+            else:
+                simulation.click(entry[1:])
+        self.inputs.clear()
+        simulation.tick(ALL_KEYS[self.mask])
+
+    def snapshot(self):
+        simulation = self.simulation
+        character = simulation.character
+        return {
+            "x": character.rect.x,
+            "y": character.rect.y,
+            "dir": character.direction,
+            "run": character.state == "run",
+            "dialogue": simulation.active_dialogue,
+            "line": simulation.dialogue_index,
+            "talked": sorted(simulation.talked_to),
+            "journal": simulation.show_journal,
+        }
+
+    def send(self, tick):
+        transport = self.writer.transport
+        if transport.is_closing() or transport.get_write_buffer_size() > MAX_BUFFERED:
+            return
+        state = self.snapshot()
+        if state == self.sent:
+            self.writer.write(b'{"t":%d}\n' % tick)
+            return
+        if self.sent is None:
+            delta = dict(state)
+        else:
+            delta = {key: value for key, value in state.items() if self.sent[key] != value}
+        delta["t"] = tick
+        self.sent = state
+        self.writer.write(json.dumps(delta, separators=(",", ":")).encode() + b"\n")
+
+
+# --- Server ---
+class GameServer:
+    def __init__(self, level, hz=60):
+        self.level = level
+        self.step_s = 1 / hz
+        self.sessions = set()
+        self.tick = 0
+        self.tick_ms = deque(maxlen=hz)  # Cost of the last second of ticks
+        self.dropped = 0  # Ticks skipped because the server could not keep up
+
+    async def handle(self, reader, writer):
+        session = Session(self.level, writer)
+        self.sessions.add(session)
+        try:
+            async for line in reader:
+                session.receive(line.decode("ascii", "replace").strip())
+        except (ConnectionError, ValueError, asyncio.LimitOverrunError):
+            pass  # Dropped, or sent a line over the stream limit: close it like any other
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    def step(self):
+        start = time.perf_counter()
+        self.tick += 1
+        for session in self.sessions:
+            session.step()
+        for session in self.sessions:
+            session.send(self.tick)
+        self.tick_ms.append((time.perf_counter() - start) * 1000)
+
+    async def run(self, report_s=1.0):
+        next_tick = next_report = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            behind = 0
+            while now >= next_tick and behind < MAX_TICKS_PER_LOOP:
+                self.step()
+                next_tick += self.step_s
+                behind += 1
+            if now >= next_tick:
+                missed = int((now - next_tick) / self.step_s) + 1
+                self.dropped += missed
+                next_tick += missed * self.step_s
+            if report_s and now >= next_report:
+                self.report()
+                next_report = now + report_s
+            await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+
+    def report(self):
+        if not self.tick_ms:
+            return
+        mean = sum(self.tick_ms) / len(self.tick_ms)
+        load = mean / (self.step_s * 1000) * 100
+        print(
+            f"tick {self.tick}: {len(self.sessions)} sessions, {mean:.2f} ms/tick "
+            f"(max {max(self.tick_ms):.2f}, {load:.0f}% of budget), {self.dropped} ticks dropped",
+            flush=True,
+        )
+
+
+async def serve(host=HOST, port=PORT):
+    server = GameServer(load_level(VIEW_SIZE))
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f"Serving on {host}:{port}", flush=True)
+    async with listener:
+        await server.run()
+
+
+# --- Load Generator ---
+class Bot:
+    # Wanders by changing its held keys now and then, and reads every update
+    def __init__(self, rng):
+        self.rng = rng
+        self.lines = 0
+        self.bytes = 0
+
+    async def run(self, host, port, stop):
+        reader, writer = await asyncio.open_connection(host, port)
+        reading = asyncio.ensure_future(self.read(reader))
+        try:
+            while not stop.is_set() and not reading.done():  # Stop once the server hangs up
+                mask = self.rng.choice((0, 1, 2, 4, 8, 5, 9))
+                writer.write(f"t {mask}\n".encode())
+                if self.rng.random() < 0.2:
+                    writer.write(f"p {pygame.K_SPACE}\n".encode())
+                await asyncio.sleep(self.rng.uniform(0.2, 1.0))
+        finally:
+            reading.cancel()
+            writer.close()
+
+    async def read(self, reader):
+        while True:
+            chunk = await reader.read(1 << 16)
+            if not chunk:
+                return
+            self.bytes += len(chunk)
+            self.lines += chunk.count(b"\n")
+
+
+async def generate_load(counts, seconds, host=HOST, port=PORT, hz=60, seed=0):
+    rng = random.Random(seed)
+    stop = asyncio.Event()
+    bots, tasks = [], []
+    sustained = 0
+    for count in counts:
+        while len(bots) < count:
+            bot = Bot(random.Random(rng.random()))
+            bots.append(bot)
+            tasks.append(asyncio.ensure_future(bot.run(host, port, stop)))
+        await asyncio.sleep(1.0)  # Let new sessions connect and settle
+
+        before = [(bot.lines, bot.bytes) for bot in bots]
+        start = time.perf_counter()
+        await asyncio.sleep(seconds)
+        elapsed = time.perf_counter() - start
+        rates = [(bot.lines - lines) / elapsed for bot, (lines, _) in zip(bots, before)]
+        received = sum(bot.bytes - sent for bot, (_, sent) in zip(bots, before)) / elapsed
+
+        mean = sum(rates) / len(rates)
+        ok = min(rates) >= hz * 0.98
+        if ok:
+            sustained = count
+        print(
+            f"{count:5d} sessions: {mean:5.1f} ticks/s per session (min {min(rates):5.1f}), "
+            f"{received / 1024:7.0f} KiB/s  {'ok' if ok else 'BEHIND'}",
+            flush=True,
+        )
+        if any(task.done() for task in tasks):
+            for task in tasks:
+                if task.done() and task.exception():
+                    print(f"Bot failed: {task.exception()!r}", file=sys.stderr)
+                    break
+            break
+
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return sustained
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the headless game server or load it with bots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("serve", "host sessions"), ("load", "connect bots to a running server")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--host", default=HOST)
+        command.add_argument("--port", type=int, default=PORT)
+    load_parser = commands.choices["load"]
+    load_parser.add_argument("--clients", default="50,100,200,400", help="session counts to step through (default: %(default)s)")
+    load_parser.add_argument("--seconds", type=float, default=5.0, help="measuring time per step (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        headless()
+        try:
+            asyncio.run(serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    counts = [int(count) for count in args.clients.split(",")]
+    sustained = asyncio.run(generate_load(counts, args.seconds, args.host, args.port))
+    print(f"Sustained {sustained} sessions at 60 ticks/s")
+    return 0 if sustained else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
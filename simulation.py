@@ -0,0 +1,119 @@
+import pygame
+
+from level import NPC_DIALOGUES
+
+PLAYER_SPEED = 4
+SIM_HZ = 60  # Simulation ticks per second, independent of FPS
+SIM_STEP_MS = 1000 / SIM_HZ
+
+
+# --- Simulation ---
+class Simulation:
+    # One play-through: the player, dialogue and journal state and the rules that
+    # change them. No rendering and no input devices, so it can be driven by a
+    # replay as easily as by the game loop. Every input goes through press(),
+    # click() or tick(), and an optional log sees each of them.
+    def __init__(self, level, log=None):
+        self.level = level
+        self.log = log
+        self.character = level.new_character()
+
+        # --- Dialogue State ---
+        self.active_dialogue = None
+        self.dialogue_lines = []
+        self.dialogue_index = 0
+        self.active_npc = None
+
+        # --- Journal System ---
+        self.talked_to = set()
+        self.show_journal = False
+
+        self.walk_goal = None    # World position of the last click
+        self.walk_target = None  # Flow field the player follows towards it
+
+    def nearby_npc(self):
+        return self.level.npc_index.first(self.character.rect)
+
+    def press(self, key):
+        if self.log is not None:
+            self.log.press(key)
+        if key != pygame.K_SPACE:
+            return
+        if self.show_journal:
+            self.show_journal = False
+            return
+        if self.active_dialogue:
+            self.dialogue_index += 1
+            if self.dialogue_index >= len(self.dialogue_lines):
+                self.talked_to.add(self.active_dialogue)
+                self.active_dialogue = None
+                if len(self.talked_to) == 3:
+                    self.show_journal = True
+            return
+        npc = self.nearby_npc()
+        if npc:
+            name, img, npc_rect, dialogue_hitbox = npc
+            self.active_dialogue = name
+            self.dialogue_lines = NPC_DIALOGUES[name]
+            self.dialogue_index = 0
+            self.active_npc = npc_rect
+
+    def click(self, world_pos):
+        if self.log is not None:
+            self.log.click(world_pos)
+        self.walk_goal = world_pos
+        self.walk_target = self.level.flow_fields.field_to(world_pos)
+
+    def tick(self, keys):
+        if self.log is not None:
+            self.log.tick(keys)
+        character = self.character
+        dx = dy = 0
+        direction = character.direction
+        moving = False
+
+        if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+            dx -= PLAYER_SPEED
+            direction = 1
+            moving = True
+        if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+            dx += PLAYER_SPEED
+            direction = 2
+            moving = True
+        if keys[pygame.K_UP] or keys[pygame.K_w]:
+            dy -= PLAYER_SPEED
+            direction = 3
+            moving = True
+        if keys[pygame.K_DOWN] or keys[pygame.K_s]:
+            dy += PLAYER_SPEED
+            direction = 0
+            moving = True
+
+        if moving:
+            self.walk_target = None
+        elif self.walk_target:
+            flow_fields = self.level.flow_fields
+            if self.walk_target.version != flow_fields.version:
+                # Tiles streamed in since the click; a replay, with every tile loaded, walks the new grid
+                self.walk_target = flow_fields.field_to(self.walk_goal)
+            step = flow_fields.walk_step(self.walk_target, character.rect, PLAYER_SPEED, self.level.can_stand) if self.walk_target else None
+            if step is None:
+                self.walk_target = None  # Arrived, or nowhere left to go
+            else:
+                dx, dy, direction = step
+                moving = True
+
+        character.previous_pos = character.rect.midbottom
+        if dx or dy:
+            new_rect = character.rect.move(dx, dy)
+            if self.level.can_stand(new_rect):
+                character.rect = new_rect
+
+        character.update(SIM_STEP_MS, moving, direction)
+
+    def state(self):
+        return {
+            "rect": list(self.character.rect),
+            "talked_to": sorted(self.talked_to),
+            "show_journal": self.show_journal,
+        }
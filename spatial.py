@@ -0,0 +1,81 @@
+import numpy as np
+
+
+# --- Uniform Grid Spatial Hash ---
+class SpatialHash:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.count = 0
+
+    def cell_range(self, rect):
+        size = self.cell_size
+        left = rect.left // size
+        top = rect.top // size
+        right = (rect.right - 1) // size
+        bottom = (rect.bottom - 1) // size
+        for cy in range(top, bottom + 1):
+            for cx in range(left, right + 1):
+                yield cx, cy
+
+    def insert(self, rect, item):
+        # Entries remember insertion order so queries can honour list priority
+        entry = (self.count, rect, item)
+        self.count += 1
+        for cell in self.cell_range(rect):
+            self.cells.setdefault(cell, []).append(entry)
+
+    def query(self, rect):
+        seen = set()
+        hits = []
+        for cell in self.cell_range(rect):
+            for entry in self.cells.get(cell, ()):
+                order, other, _ = entry
+                if order not in seen:
+                    seen.add(order)
+                    if rect.colliderect(other):
+                        hits.append(entry)
+        hits.sort(key=lambda entry: entry[0])
+        return [item for _, _, item in hits]
+
+    def first(self, rect):
+        best = None
+        for cell in self.cell_range(rect):
+            for entry in self.cells.get(cell, ()):
+                if (best is None or entry[0] < best[0]) and rect.colliderect(entry[1]):
+                    best = entry
+        return best[2] if best else None
+
+    def collides(self, rect):
+        for cell in self.cell_range(rect):
+            for _, other, _ in self.cells.get(cell, ()):
+                if rect.colliderect(other):
+                    return True
+        return False
+
+
+# --- Vectorized Overlap ---
+def rect_array(rects):
+    # Rects as an (N, 4) array of left, top, right, bottom
+    return np.array([(r.left, r.top, r.right, r.bottom) for r in rects], dtype=float).reshape(-1, 4)
+
+
+def overlaps(lefts, tops, widths, heights, boxes):
+    # Same test as Rect.colliderect, for every rect against every box: (rects, boxes) bools
+    lefts, tops = np.reshape(lefts, (-1, 1)), np.reshape(tops, (-1, 1))
+    rights, bottoms = lefts + np.reshape(widths, (-1, 1)), tops + np.reshape(heights, (-1, 1))
+    return (lefts < boxes[:, 2]) & (boxes[:, 0] < rights) & (tops < boxes[:, 3]) & (boxes[:, 1] < bottoms)
+
+
+def overlaps_any(lefts, tops, widths, heights, boxes):
+    if not len(boxes):
+        return np.zeros(np.shape(lefts), dtype=bool)
+    return overlaps(lefts, tops, widths, heights, boxes).any(axis=1)
+
+
+def first_overlap(lefts, tops, widths, heights, boxes):
+    # Index of the first box each rect overlaps, or -1; like SpatialHash.first
+    if not len(boxes):
+        return np.full(np.shape(lefts), -1)
+    hits = overlaps(lefts, tops, widths, heights, boxes)
+    return np.where(hits.any(axis=1), hits.argmax(axis=1), -1)
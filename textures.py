@@ -0,0 +1,153 @@
+import warnings
+
+import numpy as np
+import pygame
+
+from render import surface_bytes
+
+# --- Surface Formats ---
+OPAQUE = "opaque"      # Every pixel solid: plain display format, no blending
+COLORKEY = "colorkey"  # Pixels fully solid or fully clear: one colour marks the clear ones
+ALPHA = "alpha"        # Soft edges or translucency: per-pixel alpha
+FORMATS = (OPAQUE, COLORKEY, ALPHA)
+
+RLE_MIN_CLEAR = 0.25  # Share of clear pixels from which run-length encoding pays off
+KEY_COLORS = ((255, 0, 255), (0, 255, 255), (1, 254, 1))  # Tried in order, must not be a visible colour
+TEXTURE_BUDGET_BYTES = 192 * 1024 * 1024  # Loaded textures plus the render caches; warns when passed
+
+
+def alpha_values(surface):
+    if surface.get_flags() & pygame.SRCALPHA:
+        return pygame.surfarray.array_alpha(surface)
+    if surface.get_colorkey() is not None:
+        return pygame.surfarray.array_colorkey(surface)
+    return None
+
+
+def classify(surface):
+    # (format, share of fully clear pixels)
+    alpha = alpha_values(surface)
+    if alpha is None or not alpha.size:
+        return OPAQUE, 0.0
+    clear = np.count_nonzero(alpha == 0) / alpha.size
+    if not clear and alpha.min() == 255:
+        return OPAQUE, 0.0
+    if np.count_nonzero((alpha > 0) & (alpha < 255)):
+        return ALPHA, clear
+    return COLORKEY, clear
+
+
+def free_key_color(surface):
+    visible = pygame.surfarray.array_alpha(surface) > 0
+    colors = pygame.surfarray.pixels3d(surface)
+    try:
+        for key in KEY_COLORS:
+            if not (visible & (colors == key).all(axis=2)).any():
+                return key
+    finally:
+        del colors  # Unlocks the surface
+    return None
+
+
+def optimize(surface, rle=True):
+    # A copy in the cheapest display format that draws the same pixels, and
+    # its format. Needs a display mode, like convert(). RLE surfaces blit
+    # much faster but are slow to read or draw onto, so leave rle off for
+    # surfaces that are composed into others. Per-pixel alpha blits may
+    # round translucent pixels by one step when RLE encoded.
+    kind, clear = classify(surface)
+    flags = pygame.RLEACCEL if rle and clear >= RLE_MIN_CLEAR else 0
+    key = free_key_color(surface) if kind == COLORKEY else None
+    if kind == COLORKEY and key is None:
+        kind = ALPHA
+
+    if kind == OPAQUE:
+        return surface.convert(), kind
+    if kind == COLORKEY:
+        keyed = pygame.Surface(surface.get_size()).convert()
+        keyed.fill(key)
+        keyed.blit(surface, (0, 0))
+        keyed.set_colorkey(key, flags)
+        return keyed, kind
+    converted = surface.convert_alpha()
+    if flags:
+        converted.set_alpha(255, flags)
+    return converted, kind
+
+
+def texture_bytes(surface):
+    # SDL keeps only the encoded runs of an RLE surface once it has been
+    # drawn, about one pixel for each visible one (run headers not counted)
+    size = surface_bytes(surface)
+    if surface.get_flags() & pygame.RLEACCELOK:  # Asked for; RLEACCEL only shows once encoded
+        alpha = alpha_values(surface)
+        if alpha is not None and alpha.size:
+            return int(size * np.count_nonzero(alpha) / alpha.size)
+    return size
+
+
+# --- Texture Memory Budget ---
+class TextureBudget:
+    # Bytes held by loaded textures, by category and by format, plus any
+    # render caches watched through a function returning their bytes. Warns
+    # once when the total passes max_bytes, and again only after it has
+    # dropped back under.
+    def __init__(self, max_bytes=TEXTURE_BUDGET_BYTES):
+        self.max_bytes = max_bytes
+        self.textures = {}  # (category, name) -> (format, bytes)
+        self.caches = {}
+        self.over = False
+
+    def optimize(self, surface, category, name, rle=True):
+        optimized, kind = optimize(surface, rle)
+        self.add(optimized, category, name, kind)
+        return optimized
+
+    def add(self, surface, category, name, kind):
+        # Adding under a name already known replaces its entry
+        self.textures[(category, name)] = (kind, texture_bytes(surface))
+        self.check()
+
+    def watch(self, category, bytes_held):
+        self.caches[category] = bytes_held
+
+    def clear(self, category=None):
+        for key in [key for key in self.textures if category is None or key[0] == category]:
+            del self.textures[key]
+
+    def categories(self):
+        totals = {}
+        for (category, _), (_, size) in self.textures.items():
+            totals[category] = totals.get(category, 0) + size
+        for category, bytes_held in self.caches.items():
+            totals[category] = totals.get(category, 0) + bytes_held()
+        return totals
+
+    @property
+    def total(self):
+        return sum(self.categories().values())
+
+    def check(self):
+        total = self.total
+        if total > self.max_bytes and not self.over:
+            warnings.warn(
+                f"Textures use {total / 2**20:.1f} MB, over the {self.max_bytes / 2**20:.1f} MB budget", RuntimeWarning
+            )
+        self.over = total > self.max_bytes
+        return not self.over
+
+    def report(self):
+        formats = {kind: {"count": 0, "bytes": 0} for kind in FORMATS}
+        for kind, size in self.textures.values():
+            formats[kind]["count"] += 1
+            formats[kind]["bytes"] += size
+        categories = self.categories()
+        return {
+            "total_bytes": sum(categories.values()),
+            "budget_bytes": self.max_bytes,
+            "categories": dict(sorted(categories.items())),
+            "formats": formats,
+        }
+
+
+texture_budget = TextureBudget()
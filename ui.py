@@ -0,0 +1,101 @@
+import pygame
+
+from cache import LRUCache
+from textures import optimize, texture_bytes
+
+TEXT_COLOR = (255, 255, 255)
+
+
+def wrap_text(text, font, max_width):
+    words = text.split()
+    lines = []
+    current_line = []
+
+    for word in words:
+        test_line = ' '.join(current_line + [word])
+        test_width = font.size(test_line)[0]
+
+        if test_width <= max_width:
+            current_line.append(word)
+        else:
+            if current_line:
+                lines.append(' '.join(current_line))
+            current_line = [word]
+
+    if current_line:
+        lines.append(' '.join(current_line))
+
+    return lines
+
+
+# --- Retained-Mode UI ---
+class UILayer:
+    def __init__(self, max_blocks=64, max_panels=16):
+        self.fonts = {}
+        self.blocks = LRUCache(max_blocks)
+        self.panels = LRUCache(max_panels)
+
+    def font(self, size, name=None):
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.SysFont(name, size)
+            self.fonts[key] = font
+        return font
+
+    def bytes_held(self):
+        cached = list(self.blocks.items.values()) + list(self.panels.items.values())
+        return sum(texture_bytes(surface) for surface in cached)
+
+    def text_block(self, text, size, max_width, line_height=None):
+        key = (text, size, max_width, line_height)
+        block = self.blocks.get(key)
+        if block is not None:
+            return block
+
+        font = self.font(size)
+        if line_height is None:
+            line_height = font.get_linesize()
+        lines = wrap_text(text, font, max_width)
+        rendered = [font.render(line, True, TEXT_COLOR) for line in lines]
+        width = max((surf.get_width() for surf in rendered), default=0)
+
+        block = pygame.Surface((width, line_height * len(lines)), pygame.SRCALPHA)
+        for i, surf in enumerate(rendered):
+            block.blit(surf, (0, i * line_height))
+        self.blocks.put(key, block)
+        return block
+
+    def panel(self, text, size, max_width, padding, width=None, line_height=None,
+              fill=(0, 0, 0, 200), border=0):
+        # padding is (horizontal, top, bottom); width defaults to fit the text
+        key = (text, size, max_width, padding, width, line_height, fill, border)
+        panel = self.panels.get(key)
+        if panel is not None:
+            return panel
+
+        pad_x, pad_top, pad_bottom = padding
+        block = self.text_block(text, size, max_width, line_height)
+        if width is None:
+            width = block.get_width() + pad_x * 2
+        height = pad_top + block.get_height() + pad_bottom
+
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill(fill)
+        if border:
+            pygame.draw.rect(panel, TEXT_COLOR, panel.get_rect(), border)
+        panel.blit(block, (pad_x, pad_top))
+        panel, _ = optimize(panel)  # Text blocks stay per-pixel alpha, they are only drawn onto panels
+        self.panels.put(key, panel)
+        return panel
+
+
+def draw_progress_bar(surface, rect, progress, color=TEXT_COLOR):
+    rect = pygame.Rect(rect)
+    pygame.draw.rect(surface, (0, 0, 0), rect)
+    filled = rect.inflate(-4, -4)
+    filled.width = int(filled.width * min(max(progress, 0.0), 1.0))
+    if filled.width > 0:
+        pygame.draw.rect(surface, color, filled)
+    pygame.draw.rect(surface, color, rect, 1)
+    return rect
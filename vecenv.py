@@ -0,0 +1,351 @@
+"""Batch simulation of many play-throughs across worker processes.
+
+    python vecenv.py bench [--envs 4096] [--steps 1000] [--workers 1,2,4]
+    python vecenv.py check replays/*.log
+
+VecEnv runs the player rules of Simulation (walking the fork map,
+talking through the dialogue hitboxes, the journal unlock) for many
+independent players at once, with no rendering. Every step takes one
+action per player and returns stacked observations:
+
+    pos       (N, 2) int32   hitbox top-left
+    talked    (N, 3) bool    talked_to, one column per BUILDING_NAMES entry
+    dialogue  (N,)   int8    BUILDING_NAMES index of the open dialogue, -1 for none
+    line      (N,)   int8    dialogue line shown
+    journal   (N,)   bool    journal open
+    done      (N,)   bool    journal unlocked, or max_steps reached
+    steps     (N,)   int32   steps since the last reset
+
+An action holds the movement bitmask of the input logs (left 1, right 2,
+up 4, down 8) plus TALK (16) for a SPACE press. The press is handled
+before the movement, as in the game loop. Players that finished are
+reset at the start of the next step.
+
+Players are split evenly between worker processes. Each one loads the
+level once and steps its slice of shared-memory arrays in place, so a
+step sends nothing but a one-word command to each worker. The arrays
+returned are views into that memory: they change with the next step
+and must not be used after close().
+'check' replays input logs through the batch rules and compares each
+end state with the one recorded.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from level import BUILDING_NAMES, NPC_DIALOGUES, VIEW_SIZE
+from replay import MOVE_KEYS, InputLog, headless, load_level
+from simulation import PLAYER_SPEED
+from spatial import first_overlap, overlaps_any, rect_array
+
+TALK = 1 << len(MOVE_KEYS)
+ACTIONS = TALK << 1  # Action values run 0 .. ACTIONS - 1
+MAX_STEPS = 3600  # One minute of play at 60 ticks per second
+
+FIELDS = (
+    ("actions", np.uint8, ()),
+    ("pos", np.int32, (2,)),
+    ("talked", np.bool_, (len(BUILDING_NAMES),)),
+    ("dialogue", np.int8, ()),
+    ("line", np.int8, ()),
+    ("journal", np.bool_, ()),
+    ("done", np.bool_, ()),
+    ("steps", np.int32, ()),
+)
+
+
+# --- Batch Rules ---
+class BatchRules:
+    # Simulation.press(K_SPACE) and Simulation.tick() over arrays of players.
+    # Click-to-walk has no action, so walk targets are left out.
+    def __init__(self, level, max_steps=MAX_STEPS, autoreset=True):
+        rect = level.new_character().rect
+        self.start = rect.topleft
+        self.width, self.height = rect.size
+        self.walk_map = level.walk_map
+        self.buildings = rect_array([collider for _, collider in level.building_colliders])
+        self.hitboxes = rect_array([hitbox for _, _, _, hitbox in level.npc_data])
+        self.hitbox_columns = np.array([BUILDING_NAMES.index(name) for name, *_ in level.npc_data], dtype=np.int8)
+        self.line_counts = np.array([len(NPC_DIALOGUES[name]) for name in BUILDING_NAMES])
+        self.max_steps = max_steps
+        self.autoreset = autoreset
+
+    def reset(self, state, which=slice(None)):
+        state["pos"][which] = self.start
+        state["talked"][which] = False
+        state["dialogue"][which] = -1
+        state["line"][which] = 0
+        state["journal"][which] = False
+        state["done"][which] = False
+        state["steps"][which] = 0
+
+    def step(self, state):
+        if self.autoreset and state["done"].any():
+            self.reset(state, state["done"].copy())
+        actions = state["actions"].astype(np.intp)
+        pos, talked, dialogue, line, journal = (state[key] for key in ("pos", "talked", "dialogue", "line", "journal"))
+        state["steps"] += 1
+
+        # --- Talking ---
+        press = (actions & TALK) != 0
+        if press.any():
+            closing = press & journal
+            journal[closing] = False
+            press &= ~closing
+
+            talking = press & (dialogue >= 0)
+            line[talking] += 1
+            finished = np.flatnonzero(talking & (line >= self.line_counts[np.maximum(dialogue, 0)]))
+            talked[finished, dialogue[finished]] = True
+            dialogue[finished] = -1
+            journal[finished] |= talked[finished].all(axis=1)
+
+            starting = np.flatnonzero(press & ~talking)
+            if starting.size:
+                npc = first_overlap(pos[starting, 0], pos[starting, 1], self.width, self.height, self.hitboxes)
+                found = npc >= 0
+                dialogue[starting[found]] = self.hitbox_columns[npc[found]]
+                line[starting[found]] = 0
+
+        # --- Walking ---
+        dx = (((actions >> 1) & 1) - (actions & 1)) * PLAYER_SPEED
+        dy = (((actions >> 3) & 1) - ((actions >> 2) & 1)) * PLAYER_SPEED
+        moving = np.flatnonzero(dx | dy)
+        if moving.size:
+            xs = pos[moving, 0] + dx[moving]
+            ys = pos[moving, 1] + dy[moving]
+            widths = np.full(moving.size, self.width)
+            heights = np.full(moving.size, self.height)
+            free = self.walk_map.can_move_many(xs, ys, widths, heights)
+            free &= ~overlaps_any(xs, ys, widths, heights, self.buildings)
+            pos[moving[free], 0] = xs[free]
+            pos[moving[free], 1] = ys[free]
+
+        state["done"][:] = journal | (state["steps"] >= self.max_steps)
+
+
+# --- Shared Memory ---
+class SharedArrays:
+    # One shared-memory block per field, seen as (count, ...) arrays; pass
+    # names to attach to blocks another process created
+    def __init__(self, count, names=None):
+        self.blocks = {}
+        self.arrays = {}
+        for field, dtype, shape in FIELDS:
+            if names is None:
+                nbytes = count * int(np.prod(shape, dtype=int)) * np.dtype(dtype).itemsize
+                block = SharedMemory(create=True, size=max(nbytes, 1))
+            else:
+                block = SharedMemory(name=names[field])
+            self.blocks[field] = block
+            self.arrays[field] = np.ndarray((count, *shape), dtype, buffer=block.buf)
+
+    @property
+    def names(self):
+        return {field: block.name for field, block in self.blocks.items()}
+
+    def views(self, start, stop):
+        return {field: array[start:stop] for field, array in self.arrays.items()}
+
+    def close(self, unlink=False):
+        self.arrays.clear()  # Views must go before the buffers can be released
+        for block in self.blocks.values():
+            block.close()
+            if unlink:
+                block.unlink()
+        self.blocks.clear()
+
+
+def worker(conn, names, count, start, stop, max_steps, autoreset):
+    headless()
+    rules = BatchRules(load_level(VIEW_SIZE), max_steps, autoreset)
+    shared = SharedArrays(count, names)
+    state = shared.views(start, stop)
+    conn.send("ready")
+    try:
+        while True:
+            command = conn.recv()
+            if command == "step":
+                rules.step(state)
+            elif command == "reset":
+                rules.reset(state)
+            else:
+                break
+            conn.send(None)
+    finally:
+        state.clear()
+        shared.close()
+
+
+# --- Vectorized Environment ---
+class VecEnv:
+    # workers=0 steps every player in this process; None uses every core
+    def __init__(self, count, workers=None, max_steps=MAX_STEPS, autoreset=True):
+        self.count = count
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, count)
+        self.shared = SharedArrays(count)
+        self.state = self.shared.views(0, count)
+        self.connections = []
+        self.processes = []
+        self.rules = None
+
+        if not workers:
+            headless()
+            self.rules = BatchRules(load_level(VIEW_SIZE), max_steps, autoreset)
+            return
+
+        context = multiprocessing.get_context("spawn")  # Same behaviour on every platform
+        bounds = np.linspace(0, count, workers + 1).astype(int)
+        try:
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                parent, child = context.Pipe()
+                process = context.Process(
+                    target=worker,
+                    args=(child, self.shared.names, count, start, stop, max_steps, autoreset),
+                    daemon=True,
+                )
+                process.start()
+                self.connections.append(parent)
+                self.processes.append(process)
+            for conn in self.connections:
+                conn.recv()
+        except (EOFError, OSError):
+            # A worker died while loading; don't leave the shared blocks behind
+            for process in self.processes:
+                process.kill()
+            self.state.clear()
+            self.shared.close(unlink=True)
+            raise
+
+    def broadcast(self, command):
+        for conn in self.connections:
+            conn.send(command)
+        for conn in self.connections:
+            conn.recv()
+
+    def observations(self):
+        return {field: array for field, array in self.state.items() if field != "actions"}
+
+    def reset(self):
+        if self.rules:
+            self.rules.reset(self.state)
+        else:
+            self.broadcast("reset")
+        return self.observations()
+
+    def step(self, actions):
+        self.state["actions"][:] = actions
+        if self.rules:
+            self.rules.step(self.state)
+        else:
+            self.broadcast("step")
+        return self.observations()
+
+    def close(self):
+        for conn in self.connections:
+            conn.send("close")
+        for process in self.processes:
+            process.join()
+        self.connections.clear()
+        self.processes.clear()
+        self.state.clear()
+        self.shared.close(unlink=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- Command Line ---
+def log_actions(log):
+    # One action per tick; a press rides on the tick that follows it
+    actions = []
+    pressed = False
+    for entry in log.entries:
+        if entry[0] == "p":
+            if entry[1] == 32:  # pygame.K_SPACE; other keys do nothing in Simulation
+                if pressed:
+                    raise ValueError("two presses before one tick")
+                pressed = True
+        elif entry[0] == "c":
+            raise ValueError("clicks have no batch action")
+        else:
+            count, mask = entry[1], entry[2]
+            actions.append(mask | (TALK if pressed else 0))
+            actions.extend([mask] * (count - 1))
+            pressed = False
+    return actions
+
+
+def check(paths):
+    failures = 0
+    for path in paths:
+        log = InputLog.load(path)
+        try:
+            actions = log_actions(log)
+        except ValueError as error:
+            print(f"skip {path}: {error}")
+            continue
+        with VecEnv(1, workers=0, max_steps=len(actions) + 1, autoreset=False) as env:
+            obs = env.reset()
+            for action in actions:
+                obs = env.step(action)
+            pos = obs["pos"][0].tolist()
+            talked = sorted(name for name, flag in zip(BUILDING_NAMES, obs["talked"][0]) if flag)
+            journal = bool(obs["journal"][0])
+        expected = log.final_state
+        if pos == expected["rect"][:2] and talked == expected["talked_to"] and journal == expected["show_journal"]:
+            print(f"ok   {path}: {len(actions)} steps")
+        else:
+            print(f"FAIL {path}: expected {expected}, got pos {pos}, talked {talked}, journal {journal}")
+            failures += 1
+    return failures
+
+
+def bench(envs, steps, workers, seed=0):
+    rng = np.random.default_rng(seed)
+    # Mostly walking, with a SPACE press now and then
+    actions = rng.choice([0, 1, 2, 4, 8, 5, 6, 9, 10], size=(64, envs)).astype(np.uint8)
+    actions[rng.random((64, envs)) < 0.05] |= TALK
+    with VecEnv(envs, workers=workers) as env:
+        env.reset()
+        start = time.perf_counter()
+        finished = 0
+        for step in range(steps):
+            obs = env.step(actions[(step // 30) % len(actions)])  # Hold each action for half a second
+            finished += int(obs["done"].sum())
+        elapsed = time.perf_counter() - start
+    rate = envs * steps / elapsed
+    print(f"{workers:2d} workers, {envs} envs: {rate:12,.0f} env-steps/s, {elapsed / steps * 1000:6.2f} ms/step, {finished} finished")
+    return rate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Step many headless play-throughs at once.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bench_parser = commands.add_parser("bench", help="measure batch stepping speed")
+    bench_parser.add_argument("--envs", type=int, default=4096)
+    bench_parser.add_argument("--steps", type=int, default=1000)
+    bench_parser.add_argument("--workers", default=str(os.cpu_count() or 1), help="worker counts to try (default: %(default)s)")
+    check_parser = commands.add_parser("check", help="replay input logs through the batch rules")
+    check_parser.add_argument("logs", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "check":
+        return 1 if check(args.logs) else 0
+    for workers in args.workers.split(","):
+        bench(args.envs, args.steps, int(workers))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
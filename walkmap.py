@@ -0,0 +1,108 @@
+import numpy as np
+import pygame
+
+
+# --- Path Color Detection ---
+def is_path_color(color):
+    r, g, b = color[:3]
+    if g > r + 20 and g > b + 20 and g > 100:
+        return False
+    if r > 80 and g > 60 and b < 80 and abs(r - g) < 40:
+        return True
+    if abs(r - g) < 20 and abs(g - b) < 20 and r > 50 and r < 180:
+        return True
+    return True
+
+
+def build_tile_mask(surface):
+    # One byte per pixel, row-major: 1 = walkable, 0 = blocked
+    data = pygame.image.tobytes(surface, "RGB")
+    return bytes(is_path_color(data[i:i + 3]) for i in range(0, len(data), 3))
+
+
+def build_tile_masks(tiles):
+    return {tile_num: build_tile_mask(img) for tile_num, img in tiles.items()}
+
+
+# --- Walkability Map ---
+class WalkMap:
+    def __init__(self, tile_map, tile_masks, tile_size, origin=(0, 0)):
+        self.tile_map = tile_map
+        self.masks = tile_masks
+        self.tile_size = tile_size
+        self.origin_x, self.origin_y = origin
+        self.rows = len(tile_map)
+        self.cols = len(tile_map[0]) if len(tile_map) else 0
+        self.mask_stack, self.tile_index = self.build_arrays()
+
+    def invalidate(self):
+        # Call after adding tile masks or editing the tile map
+        self.mask_stack, self.tile_index = self.build_arrays()
+
+    def build_arrays(self):
+        # Masks stacked into one array for vectorized lookups; slot 0 is an all-blocked tile
+        size = self.tile_size
+        stack = np.zeros((len(self.masks) + 1, size, size), dtype=bool)
+        grid = np.asarray(self.tile_map).reshape(self.rows, self.cols)
+        self.tile_rows = grid.tolist()  # Plain lists index faster than the array for single points
+        index = np.zeros(grid.shape, dtype=np.intp)
+        for slot, (tile_num, mask) in enumerate(self.masks.items(), 1):
+            stack[slot] = np.frombuffer(mask, dtype=np.uint8).reshape(size, size) == 1
+            index[grid == tile_num] = slot
+        return stack, index
+
+    def is_walkable(self, x, y):
+        local_x = x - self.origin_x
+        local_y = y - self.origin_y
+        if local_x < 0 or local_y < 0:
+            return False
+
+        tile_x, pixel_x = divmod(local_x, self.tile_size)
+        tile_y, pixel_y = divmod(local_y, self.tile_size)
+        if tile_y >= self.rows or tile_x >= self.cols:
+            return False
+
+        mask = self.masks.get(self.tile_rows[tile_y][tile_x])
+        if mask is None:
+            return False
+        return mask[pixel_y * self.tile_size + pixel_x] == 1
+
+    def can_move(self, rect):
+        right = rect.right - 1
+        bottom = rect.bottom - 1
+        is_walkable = self.is_walkable
+        return (
+            is_walkable(rect.centerx, rect.centery)
+            and is_walkable(rect.left, rect.top)
+            and is_walkable(right, rect.top)
+            and is_walkable(rect.left, bottom)
+            and is_walkable(right, bottom)
+            and is_walkable(rect.centerx, rect.top)
+            and is_walkable(rect.centerx, bottom)
+            and is_walkable(rect.left, rect.centery)
+            and is_walkable(right, rect.centery)
+        )
+
+    def are_walkable(self, xs, ys):
+        # Array version of is_walkable
+        local_x = np.asarray(xs) - self.origin_x
+        local_y = np.asarray(ys) - self.origin_y
+        inside = (
+            (local_x >= 0) & (local_y >= 0)
+            & (local_x < self.cols * self.tile_size) & (local_y < self.rows * self.tile_size)
+        )
+        if not self.tile_index.size:
+            return inside
+        tile_x, pixel_x = np.divmod(np.where(inside, local_x, 0), self.tile_size)
+        tile_y, pixel_y = np.divmod(np.where(inside, local_y, 0), self.tile_size)
+        return inside & self.mask_stack[self.tile_index[tile_y, tile_x], pixel_y, pixel_x]
+
+    def can_move_many(self, lefts, tops, widths, heights):
+        # Array version of can_move over the same nine sample points
+        rights = lefts + widths - 1
+        bottoms = tops + heights - 1
+        center_x = lefts + widths // 2
+        center_y = tops + heights // 2
+        xs = np.stack([center_x, lefts, rights, lefts, rights, center_x, center_x, lefts, rights])
+        ys = np.stack([center_y, tops, tops, bottoms, bottoms, tops, bottoms, center_y, center_y])
+        return self.are_walkable(xs, ys).all(axis=0)